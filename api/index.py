@@ -2,16 +2,18 @@
 Vercel serverless function entry point for PackCheck API
 """
 import sys
-import os
+from pathlib import Path
 
-# Add the backend directory to Python path
-backend_path = os.path.join(os.path.dirname(__file__), '..', 'backend')
-sys.path.insert(0, backend_path)
+# The backend modules import each other as top-level packages (api, services, utils),
+# so the backend directory has to be importable. Resolve it once and only add it if
+# the deployment (e.g. PYTHONPATH) hasn't already.
+BACKEND_PATH = str(Path(__file__).resolve().parent.parent / 'backend')
+if BACKEND_PATH not in sys.path:
+    sys.path.insert(0, BACKEND_PATH)
 
-from app import create_app
-
-# Create the Flask app
-app = create_app()
+# backend/app.py already builds the app at import (for Gunicorn); reuse it
+# rather than running the factory a second time
+from app import app
 
 # Vercel serverless function handler
 def handler(event, context):
@@ -3,13 +3,94 @@ Community API - Community verification and contributions
 """
 
 from flask import Blueprint, request, jsonify
-from datetime import datetime
+from collections import defaultdict, deque
+from functools import lru_cache
+from operator import itemgetter
+from threading import Lock
+import heapq
+import itertools
+import json
+import os
+
+from utils.timestamps import now_iso
+from utils.http_cache import conditional_json
 
 community_bp = Blueprint('community', __name__)
 
 # Community data storage (would use database in production)
 community_verifications = {}
-community_corrections = []
+
+# Log of reviewed (approved/rejected) corrections in review order, capped so
+# long-running workers don't grow without bound. Evicting the oldest entry
+# also drops it from the indexes and contributor counts below. Pending
+# corrections are not in the log, so they are never evicted before review.
+community_corrections = deque(maxlen=int(os.getenv('CORRECTIONS_CACHE', 10000)))
+
+# Lookup index over all live corrections, pending and reviewed
+community_corrections_by_id = {}
+
+# Corrections partitioned by review status, keyed by verification_id
+corrections_by_status = {
+    'pending': {},
+    'approved': {},
+    'rejected': {}
+}
+
+# Change counters for conditional GETs (per product / per status bucket)
+verification_versions = {}
+corrections_versions = {status: 0 for status in corrections_by_status}
+
+# Source of verification IDs (cv_1, cv_2, ...)
+_verification_counter = itertools.count(1)
+
+# Per-user contribution counts (maintained on submission and review)
+user_contributions = defaultdict(lambda: {
+    'user_id': None,
+    'total': 0,
+    'approved': 0,
+    'pending': 0,
+    'rejected': 0
+})
+
+# Serializes writes to the stores above: gthread workers run several requests
+# at once, and a submission or review updates several of them in steps
+_corrections_lock = Lock()
+
+_PRODUCT_ID_PLACEHOLDER = '__product_id__'
+
+def _encode_template(body):
+    """Pre-encode a response body around a product_id placeholder (keys sorted like jsonify)"""
+    encoded = json.dumps(body, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    prefix, suffix = encoded.split(json.dumps(_PRODUCT_ID_PLACEHOLDER).encode('utf-8'))
+    return prefix, suffix
+
+# Responses for products without any community activity (the common case)
+_EMPTY_VERIFICATIONS_BODY = _encode_template({
+    'success': True,
+    'product_id': _PRODUCT_ID_PLACEHOLDER,
+    'verifications': {
+        'confirmations': 0,
+        'corrections': 0,
+        'flags': 0,
+        'verified_data': None,
+        'last_confirmed_at': None
+    }
+})
+_EMPTY_BADGE_BODY = _encode_template({
+    'success': True,
+    'product_id': _PRODUCT_ID_PLACEHOLDER,
+    'badge': {
+        'has_badge': False,
+        'badge_level': None,
+        'verification_count': 0,
+        'last_verified': None
+    }
+})
+
+def _render_template(template, product_id):
+    """Fill a pre-encoded template with a (JSON-escaped) product_id"""
+    prefix, suffix = template
+    return prefix + json.dumps(product_id).encode('utf-8') + suffix
 
 @community_bp.route('/verify', methods=['POST'])
 def submit_community_verification():
@@ -26,47 +107,59 @@ def submit_community_verification():
     Returns:
         Verification submission confirmation
     """
-    data = request.get_json()
+    data = request.get_json(silent=True)
+
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Product ID and User ID required'}), 400
 
-    if not data or 'product_id' not in data or 'user_id' not in data:
+    product_id, user_id = data.get('product_id'), data.get('user_id')
+
+    if product_id is None or user_id is None:
         return jsonify({'error': 'Product ID and User ID required'}), 400
 
-    product_id = data['product_id']
     verification = {
-        'verification_id': f"cv_{len(community_corrections) + 1}",
+        'verification_id': f"cv_{next(_verification_counter)}",
         'product_id': product_id,
-        'user_id': data['user_id'],
+        'user_id': user_id,
         'verification_type': data.get('verification_type', 'confirm'),
         'data': data.get('data', {}),
         'confidence': data.get('confidence', 'medium'),
-        'timestamp': datetime.now().isoformat(),
+        'timestamp': now_iso(),
         'status': 'pending',  # pending, approved, rejected
         'dietitian_verified': False
     }
 
-    community_corrections.append(verification)
+    with _corrections_lock:
+        _add_correction(verification)
 
-    # Update product verification count
-    if product_id not in community_verifications:
-        community_verifications[product_id] = {
-            'confirmations': 0,
-            'corrections': 0,
-            'flags': 0,
-            'verified_data': None
-        }
+        # Update product verification count
+        if product_id not in community_verifications:
+            community_verifications[product_id] = {
+                'confirmations': 0,
+                'corrections': 0,
+                'flags': 0,
+                'verified_data': None,
+                'last_confirmed_at': None
+            }
 
-    if verification['verification_type'] == 'confirm':
-        community_verifications[product_id]['confirmations'] += 1
-    elif verification['verification_type'] == 'correct':
-        community_verifications[product_id]['corrections'] += 1
-    else:  # flag
-        community_verifications[product_id]['flags'] += 1
+        if verification['verification_type'] == 'confirm':
+            community_verifications[product_id]['confirmations'] += 1
+            last_confirmed_at = community_verifications[product_id]['last_confirmed_at']
+            if last_confirmed_at is None or verification['timestamp'] > last_confirmed_at:
+                community_verifications[product_id]['last_confirmed_at'] = verification['timestamp']
+        elif verification['verification_type'] == 'correct':
+            community_verifications[product_id]['corrections'] += 1
+        else:  # flag
+            community_verifications[product_id]['flags'] += 1
 
-    return jsonify({
-        'success': True,
-        'verification': verification,
-        'message': 'Thank you for your contribution! A dietitian will review your submission.'
-    }), 201
+        verification_versions[product_id] = verification_versions.get(product_id, 0) + 1
+
+        # Serialized under the lock: a dietitian may already be reviewing it
+        return jsonify({
+            'success': True,
+            'verification': verification,
+            'message': 'Thank you for your contribution! A dietitian will review your submission.'
+        }), 201
 
 @community_bp.route('/verify/<product_id>', methods=['GET'])
 def get_community_verifications(product_id):
@@ -76,23 +169,20 @@ def get_community_verifications(product_id):
     Returns:
         Community verification statistics
     """
-    if product_id in community_verifications:
-        return jsonify({
+    def build_body():
+        if product_id not in community_verifications:
+            return _render_template(_EMPTY_VERIFICATIONS_BODY, product_id)
+
+        return {
             'success': True,
             'product_id': product_id,
             'verifications': community_verifications[product_id]
-        }), 200
-    else:
-        return jsonify({
-            'success': True,
-            'product_id': product_id,
-            'verifications': {
-                'confirmations': 0,
-                'corrections': 0,
-                'flags': 0,
-                'verified_data': None
-            }
-        }), 200
+        }
+
+    return conditional_json(
+        f"verify-{product_id}-{verification_versions.get(product_id, 0)}",
+        build_body
+    )
 
 @community_bp.route('/corrections', methods=['GET'])
 def get_pending_corrections():
@@ -107,16 +197,19 @@ def get_pending_corrections():
     """
     status = request.args.get('status', 'pending')
 
-    filtered_corrections = [
-        c for c in community_corrections
-        if c['status'] == status
-    ]
+    def build_body():
+        filtered_corrections = list(corrections_by_status.get(status, {}).values())
 
-    return jsonify({
-        'success': True,
-        'count': len(filtered_corrections),
-        'corrections': filtered_corrections
-    }), 200
+        return {
+            'success': True,
+            'count': len(filtered_corrections),
+            'corrections': filtered_corrections
+        }
+
+    return conditional_json(
+        f"corrections-{status}-{corrections_versions.get(status, 0)}",
+        build_body
+    )
 
 @community_bp.route('/corrections/<verification_id>/approve', methods=['POST'])
 def approve_correction(verification_id):
@@ -130,34 +223,42 @@ def approve_correction(verification_id):
     Returns:
         Approval confirmation
     """
-    data = request.get_json()
+    data = request.get_json(silent=True)
 
-    if not data or 'dietitian_id' not in data:
+    if not isinstance(data, dict):
         return jsonify({'error': 'Dietitian ID required'}), 400
 
-    # Find correction
-    correction = next((c for c in community_corrections if c['verification_id'] == verification_id), None)
+    dietitian_id = data.get('dietitian_id')
 
-    if not correction:
-        return jsonify({'error': 'Verification not found'}), 404
+    if dietitian_id is None:
+        return jsonify({'error': 'Dietitian ID required'}), 400
 
-    # Approve correction
-    correction['status'] = 'approved'
-    correction['dietitian_verified'] = True
-    correction['dietitian_id'] = data['dietitian_id']
-    correction['dietitian_notes'] = data.get('notes', '')
-    correction['reviewed_at'] = datetime.now().isoformat()
+    with _corrections_lock:
+        # Find correction (may have been evicted by a concurrent review)
+        correction = community_corrections_by_id.get(verification_id)
 
-    # Update product verified data
-    product_id = correction['product_id']
-    if product_id in community_verifications:
-        community_verifications[product_id]['verified_data'] = correction['data']
+        if not correction:
+            return jsonify({'error': 'Verification not found'}), 404
 
-    return jsonify({
-        'success': True,
-        'message': 'Correction approved',
-        'verification': correction
-    }), 200
+        # Approve correction
+        _set_correction_status(correction, 'approved')
+        correction['dietitian_verified'] = True
+        correction['dietitian_id'] = dietitian_id
+        correction['dietitian_notes'] = data.get('notes', '')
+        correction['reviewed_at'] = now_iso()
+
+        # Update product verified data
+        product_id = correction['product_id']
+        if product_id in community_verifications:
+            community_verifications[product_id]['verified_data'] = correction['data']
+            verification_versions[product_id] += 1
+
+        # Serialized under the lock: another review may be updating the same correction
+        return jsonify({
+            'success': True,
+            'message': 'Correction approved',
+            'verification': correction
+        }), 200
 
 @community_bp.route('/corrections/<verification_id>/reject', methods=['POST'])
 def reject_correction(verification_id):
@@ -171,28 +272,35 @@ def reject_correction(verification_id):
     Returns:
         Rejection confirmation
     """
-    data = request.get_json()
+    data = request.get_json(silent=True)
 
-    if not data or 'dietitian_id' not in data or 'reason' not in data:
+    if not isinstance(data, dict):
         return jsonify({'error': 'Dietitian ID and reason required'}), 400
 
-    # Find correction
-    correction = next((c for c in community_corrections if c['verification_id'] == verification_id), None)
+    dietitian_id, reason = data.get('dietitian_id'), data.get('reason')
 
-    if not correction:
-        return jsonify({'error': 'Verification not found'}), 404
+    if dietitian_id is None or reason is None:
+        return jsonify({'error': 'Dietitian ID and reason required'}), 400
 
-    # Reject correction
-    correction['status'] = 'rejected'
-    correction['dietitian_id'] = data['dietitian_id']
-    correction['rejection_reason'] = data['reason']
-    correction['reviewed_at'] = datetime.now().isoformat()
+    with _corrections_lock:
+        # Find correction (may have been evicted by a concurrent review)
+        correction = community_corrections_by_id.get(verification_id)
 
-    return jsonify({
-        'success': True,
-        'message': 'Correction rejected',
-        'verification': correction
-    }), 200
+        if not correction:
+            return jsonify({'error': 'Verification not found'}), 404
+
+        # Reject correction
+        _set_correction_status(correction, 'rejected')
+        correction['dietitian_id'] = dietitian_id
+        correction['rejection_reason'] = reason
+        correction['reviewed_at'] = now_iso()
+
+        # Serialized under the lock: another review may be updating the same correction
+        return jsonify({
+            'success': True,
+            'message': 'Correction rejected',
+            'verification': correction
+        }), 200
 
 @community_bp.route('/leaderboard', methods=['GET'])
 def get_community_leaderboard():
@@ -202,35 +310,13 @@ def get_community_leaderboard():
     Returns:
         Top contributors
     """
-    # Count contributions per user
-    user_contributions = {}
-
-    for correction in community_corrections:
-        user_id = correction['user_id']
-        if user_id not in user_contributions:
-            user_contributions[user_id] = {
-                'user_id': user_id,
-                'total': 0,
-                'approved': 0,
-                'pending': 0,
-                'rejected': 0
-            }
-
-        user_contributions[user_id]['total'] += 1
-
-        if correction['status'] == 'approved':
-            user_contributions[user_id]['approved'] += 1
-        elif correction['status'] == 'pending':
-            user_contributions[user_id]['pending'] += 1
-        else:
-            user_contributions[user_id]['rejected'] += 1
-
-    # Sort by approved contributions
-    leaderboard = sorted(
-        user_contributions.values(),
-        key=lambda x: x['approved'],
-        reverse=True
-    )[:10]  # Top 10
+    # Top 10 by approved contributions (evictions delete users, so iterate under the lock)
+    with _corrections_lock:
+        leaderboard = [dict(counts) for counts in heapq.nlargest(
+            10,
+            user_contributions.values(),
+            key=itemgetter('approved')
+        )]
 
     return jsonify({
         'success': True,
@@ -253,42 +339,105 @@ def check_community_badge():
     if not product_id:
         return jsonify({'error': 'Product ID required'}), 400
 
+    def build_body():
+        if product_id not in community_verifications:
+            return _render_template(_EMPTY_BADGE_BODY, product_id)
+
+        return {
+            'success': True,
+            'product_id': product_id,
+            'badge': _badge_status(product_id)
+        }
+
+    return conditional_json(
+        f"badge-{product_id}-{verification_versions.get(product_id, 0)}",
+        build_body
+    )
+
+def _badge_status(product_id):
+    """Determine a product's community badge from its confirmations"""
+    if product_id not in community_verifications:
+        return _badge_for(0, None)
+
+    verif = community_verifications[product_id]
+    return _badge_for(verif['confirmations'], verif.get('last_confirmed_at'))
+
+@lru_cache(maxsize=4096)
+def _badge_for(confirmations, last_confirmed_at):
+    """Badge status for a confirmation count (cached - callers must not mutate the result)"""
     badge_status = {
         'has_badge': False,
         'badge_level': None,
-        'verification_count': 0,
-        'last_verified': None
+        'verification_count': confirmations,
+        'last_verified': last_confirmed_at
     }
 
-    if product_id in community_verifications:
-        verif = community_verifications[product_id]
-        confirmations = verif['confirmations']
-
-        # Award badge based on confirmations
-        if confirmations >= 10:
-            badge_status['has_badge'] = True
-            badge_status['badge_level'] = 'gold'
-        elif confirmations >= 5:
-            badge_status['has_badge'] = True
-            badge_status['badge_level'] = 'silver'
-        elif confirmations >= 3:
-            badge_status['has_badge'] = True
-            badge_status['badge_level'] = 'bronze'
-
-        badge_status['verification_count'] = confirmations
-
-        # Get last verification timestamp
-        product_corrections = [
-            c for c in community_corrections
-            if c['product_id'] == product_id and c['verification_type'] == 'confirm'
-        ]
-
-        if product_corrections:
-            latest = max(product_corrections, key=lambda x: x['timestamp'])
-            badge_status['last_verified'] = latest['timestamp']
-
-    return jsonify({
-        'success': True,
-        'product_id': product_id,
-        'badge': badge_status
-    }), 200
+    # Award badge based on confirmations
+    if confirmations >= 10:
+        badge_status['has_badge'] = True
+        badge_status['badge_level'] = 'gold'
+    elif confirmations >= 5:
+        badge_status['has_badge'] = True
+        badge_status['badge_level'] = 'silver'
+    elif confirmations >= 3:
+        badge_status['has_badge'] = True
+        badge_status['badge_level'] = 'bronze'
+
+    return badge_status
+
+def _add_correction(correction):
+    """Record a new (pending) correction in the indexes and contributor counts (call with _corrections_lock held)"""
+    verification_id = correction['verification_id']
+    user_id = correction['user_id']
+
+    community_corrections_by_id[verification_id] = correction
+    corrections_by_status['pending'][verification_id] = correction
+    corrections_versions['pending'] += 1
+
+    counts = user_contributions[user_id]
+    counts['user_id'] = user_id
+    counts['total'] += 1
+    counts['pending'] += 1
+
+def _log_reviewed(correction):
+    """Append a newly reviewed correction to the capped log, evicting the oldest reviewed one"""
+    if len(community_corrections) == community_corrections.maxlen:
+        _evict_correction(community_corrections.popleft())
+    community_corrections.append(correction)
+
+def _evict_correction(correction):
+    """Drop an evicted (reviewed) correction from the lookup indexes and contributor counts"""
+    verification_id = correction['verification_id']
+    status = correction['status']
+
+    community_corrections_by_id.pop(verification_id, None)
+    corrections_by_status[status].pop(verification_id, None)
+    corrections_versions[status] += 1
+
+    user_id = correction['user_id']
+    counts = user_contributions[user_id]
+    counts['total'] -= 1
+    counts[status] -= 1
+    if counts['total'] == 0:
+        del user_contributions[user_id]
+
+def _set_correction_status(correction, new_status):
+    """Change a correction's status, keeping status buckets and contributor counts in sync (call with _corrections_lock held)"""
+    # Read under the lock, so a concurrent review of the same correction is already applied
+    old_status = correction['status']
+    if old_status == new_status:
+        return
+    verification_id = correction['verification_id']
+
+    del corrections_by_status[old_status][verification_id]
+    corrections_by_status[new_status][verification_id] = correction
+    corrections_versions[old_status] += 1
+    corrections_versions[new_status] += 1
+
+    counts = user_contributions[correction['user_id']]
+    counts[old_status] -= 1
+    counts[new_status] += 1
+
+    correction['status'] = new_status
+    if old_status == 'pending':
+        _log_reviewed(correction)
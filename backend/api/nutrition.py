@@ -3,12 +3,39 @@ Nutrition API - Manage nutrition data and product information
 """
 
 from flask import Blueprint, request, jsonify
+from operator import itemgetter
+from threading import Lock
+import numpy as np
+
+from utils.http_cache import conditional_json
+from utils.json_response import json_response
 
 nutrition_bp = Blueprint('nutrition', __name__)
 
+_get_record_fields = itemgetter('metadata', 'nutrition_facts')
+_get_nutrition_facts = itemgetter('nutrition_facts')
+
 # In-memory storage for demo (would use database in production)
 nutrition_database = {}
 
+# Change counters for conditional GETs
+nutrition_versions = {}
+
+# Column-oriented index over nutrition_database (maintained on store)
+# Row i describes product product_ids[i]; names are casefolded, missing nutrient values are NaN
+INDEXED_NUTRIENTS = ('protein', 'carbohydrates', 'fat', 'sugar', 'calories')
+
+product_ids = []
+product_rows = {}
+product_names = []
+product_brands = []
+nutrient_columns = {nutrient: np.empty(0) for nutrient in INDEXED_NUTRIENTS}
+
+# Serializes stores: gthread workers run several requests at once, and a row
+# is claimed and the columns grown in more than one step. Readers take
+# len(product_ids) once and only look at rows below it
+_index_lock = Lock()
+
 @nutrition_bp.route('/<product_id>', methods=['GET'])
 def get_nutrition_info(product_id):
     """
@@ -20,12 +47,19 @@ def get_nutrition_info(product_id):
     Returns:
         Nutrition information
     """
-    if product_id in nutrition_database:
-        return jsonify({
-            'success': True,
-            'product_id': product_id,
-            'data': nutrition_database[product_id]
-        }), 200
+    # Version before record (stores bump it last), so a concurrent store can
+    # only pair a newer body with an older ETag, never the reverse
+    version = nutrition_versions.get(product_id, 0)
+    product_data = nutrition_database.get(product_id)
+    if product_data is not None:
+        return conditional_json(
+            f"nutrition-{product_id}-{version}",
+            lambda: {
+                'success': True,
+                'product_id': product_id,
+                'data': product_data
+            }
+        )
     else:
         return jsonify({
             'success': False,
@@ -45,19 +79,28 @@ def store_nutrition_data():
     Returns:
         Confirmation of storage
     """
-    data = request.get_json()
+    data = request.get_json(silent=True)
 
-    if not data or 'product_id' not in data or 'nutrition_facts' not in data:
+    if not isinstance(data, dict):
         return jsonify({'error': 'Missing required fields'}), 400
 
-    product_id = data['product_id']
+    product_id, nutrition_facts = data.get('product_id'), data.get('nutrition_facts')
 
-    nutrition_database[product_id] = {
-        'nutrition_facts': data['nutrition_facts'],
+    if product_id is None or nutrition_facts is None:
+        return jsonify({'error': 'Missing required fields'}), 400
+
+    product_data = {
+        'nutrition_facts': nutrition_facts,
         'metadata': data.get('metadata', {}),
         'timestamp': data.get('timestamp'),
         'verified': data.get('verified', False)
     }
+    # Readers don't take the lock: index the row first, then publish the
+    # record, then bump the version its ETag is built from
+    with _index_lock:
+        _index_product(product_id, product_data)
+        nutrition_database[product_id] = product_data
+        nutrition_versions[product_id] = nutrition_versions.get(product_id, 0) + 1
 
     return jsonify({
         'success': True,
@@ -78,35 +121,44 @@ def search_products():
     Returns:
         List of matching products
     """
-    query = request.args.get('query', '').lower()
+    query = request.args.get('query', '').casefold()
     min_protein = float(request.args.get('min_protein', 0))
     max_sugar = float(request.args.get('max_sugar', 1000))
 
     results = []
 
-    for product_id, data in nutrition_database.items():
-        nutrition = data['nutrition_facts']
-        metadata = data.get('metadata', {})
-
-        # Check if matches search criteria
-        protein = nutrition.get('protein', 0)
-        sugar = nutrition.get('sugar', 0)
-
-        name_match = query in metadata.get('name', '').lower() or query in metadata.get('brand', '').lower()
-
-        if (query == '' or name_match) and protein >= min_protein and sugar <= max_sugar:
-            results.append({
-                'product_id': product_id,
-                'name': metadata.get('name'),
-                'brand': metadata.get('brand'),
-                'nutrition_facts': nutrition
-            })
+    # Rows stored so far; a concurrent store may append more while we scan
+    n = len(product_ids)
+    names = product_names[:n]
+    brands = product_brands[:n]
+
+    # Numeric thresholds first, then substring match on the remaining rows
+    protein = _column('protein', 0, n)
+    sugar = _column('sugar', 0, n)
+    mask = (protein >= min_protein) & (sugar <= max_sugar)
+
+    for idx in np.flatnonzero(mask):
+        if query and query not in names[idx] and query not in brands[idx]:
+            continue
+
+        product_id = product_ids[idx]
+        product_data = nutrition_database.get(product_id)
+        if product_data is None:  # row indexed by a store that hasn't published yet
+            continue
+        metadata, nutrition = _get_record_fields(product_data)
+        metadata = metadata or {}
+        results.append({
+            'product_id': product_id,
+            'name': metadata.get('name'),
+            'brand': metadata.get('brand'),
+            'nutrition_facts': nutrition
+        })
 
-    return jsonify({
+    return json_response({
         'success': True,
         'count': len(results),
         'results': results
-    }), 200
+    })
 
 @nutrition_bp.route('/compare', methods=['POST'])
 def compare_products():
@@ -124,23 +176,28 @@ def compare_products():
     if not data or 'product_ids' not in data:
         return jsonify({'error': 'No product IDs provided'}), 400
 
-    product_ids = data['product_ids']
     comparison = []
+    rows = []
+
+    lookup = nutrition_database.get
+    append = comparison.append
 
-    for product_id in product_ids:
-        if product_id in nutrition_database:
-            product_data = nutrition_database[product_id]
-            comparison.append({
+    for product_id in data['product_ids']:
+        product_data = lookup(product_id)
+        if product_data is not None:
+            metadata, nutrition = _get_record_fields(product_data)
+            append({
                 'product_id': product_id,
-                'name': product_data.get('metadata', {}).get('name'),
-                'nutrition_facts': product_data['nutrition_facts']
+                'name': (metadata or {}).get('name'),
+                'nutrition_facts': nutrition
             })
+            rows.append(product_rows[product_id])
 
     if not comparison:
         return jsonify({'error': 'No valid products found'}), 404
 
     # Calculate which product is best for different goals
-    analysis = _analyze_comparison(comparison)
+    analysis = _analyze_comparison(comparison, rows)
 
     return jsonify({
         'success': True,
@@ -148,8 +205,8 @@ def compare_products():
         'analysis': analysis
     }), 200
 
-def _analyze_comparison(products):
-    """Analyze products and determine best options for different goals"""
+def _analyze_comparison(products, rows):
+    """Analyze products (at the given index rows) and determine best options for different goals"""
     analysis = {
         'highest_protein': None,
         'lowest_sugar': None,
@@ -157,52 +214,96 @@ def _analyze_comparison(products):
         'best_for_fitness': None
     }
 
-    highest_protein_val = 0
-    lowest_sugar_val = float('inf')
-    lowest_fat_val = float('inf')
-    best_fitness_score = 0
-
-    for product in products:
-        nutrition = product['nutrition_facts']
-        protein = nutrition.get('protein', 0)
-        sugar = nutrition.get('sugar', float('inf'))
-        fat = nutrition.get('fat', float('inf'))
-
-        # Highest protein
-        if protein > highest_protein_val:
-            highest_protein_val = protein
-            analysis['highest_protein'] = {
-                'product_id': product['product_id'],
-                'name': product['name'],
-                'protein': protein
-            }
+    if not products:
+        return analysis
 
-        # Lowest sugar
-        if sugar < lowest_sugar_val:
-            lowest_sugar_val = sugar
-            analysis['lowest_sugar'] = {
-                'product_id': product['product_id'],
-                'name': product['name'],
-                'sugar': sugar
-            }
+    nutrition = list(map(_get_nutrition_facts, products))
 
-        # Lowest fat
-        if fat < lowest_fat_val:
-            lowest_fat_val = fat
-            analysis['lowest_fat'] = {
-                'product_id': product['product_id'],
-                'name': product['name'],
-                'fat': fat
-            }
+    protein = _column('protein', 0).take(rows)
+    sugar = _column('sugar', float('inf')).take(rows)
+    fat = _column('fat', float('inf')).take(rows)
 
-        # Best for fitness (high protein, low sugar)
-        fitness_score = protein - (sugar * 0.5)
-        if fitness_score > best_fitness_score:
-            best_fitness_score = fitness_score
-            analysis['best_for_fitness'] = {
-                'product_id': product['product_id'],
-                'name': product['name'],
-                'score': fitness_score
-            }
+    # Best for fitness (high protein, low sugar)
+    fitness = protein - (sugar * 0.5)
+
+    # argmax/argmin pick the first extreme, same as a strict > / < scan.
+    # Reported values come from the product's own data to keep their type.
+    idx = int(protein.argmax())
+    if protein[idx] > 0:
+        analysis['highest_protein'] = _comparison_winner(
+            products[idx], 'protein', nutrition[idx].get('protein', 0)
+        )
+
+    idx = int(sugar.argmin())
+    if sugar[idx] < float('inf'):
+        analysis['lowest_sugar'] = _comparison_winner(products[idx], 'sugar', nutrition[idx]['sugar'])
+
+    idx = int(fat.argmin())
+    if fat[idx] < float('inf'):
+        analysis['lowest_fat'] = _comparison_winner(products[idx], 'fat', nutrition[idx]['fat'])
+
+    idx = int(fitness.argmax())
+    if fitness[idx] > 0:
+        analysis['best_for_fitness'] = _comparison_winner(
+            products[idx], 'score',
+            nutrition[idx].get('protein', 0) - (nutrition[idx]['sugar'] * 0.5)
+        )
 
     return analysis
+
+def _comparison_winner(product, metric, value):
+    """Format the winning product for a comparison goal"""
+    return {
+        'product_id': product['product_id'],
+        'name': product['name'],
+        metric: value
+    }
+
+def _index_product(product_id, product_data):
+    """Add or refresh a product's row in the column index (call with _index_lock held)"""
+    nutrition = product_data['nutrition_facts']
+    if not isinstance(nutrition, dict):
+        nutrition = {}
+    metadata = product_data['metadata'] or {}
+
+    row = product_rows.get(product_id)
+    if row is None:
+        row = len(product_ids)
+        _ensure_capacity(row + 1)
+        product_ids.append(product_id)
+        product_names.append('')
+        product_brands.append('')
+        product_rows[product_id] = row
+
+    product_names[row] = (metadata.get('name') or '').casefold()
+    product_brands[row] = (metadata.get('brand') or '').casefold()
+    for nutrient, column in nutrient_columns.items():
+        column[row] = _to_float(nutrition.get(nutrient))
+
+def _ensure_capacity(size):
+    """Grow the nutrient columns geometrically so appends stay amortized O(1)"""
+    capacity = len(nutrient_columns['protein'])
+    if size <= capacity:
+        return
+
+    new_capacity = max(size, capacity * 2, 64)
+    for nutrient, column in nutrient_columns.items():
+        grown = np.full(new_capacity, np.nan)
+        grown[:capacity] = column
+        nutrient_columns[nutrient] = grown
+
+def _column(nutrient, default, n=None):
+    """Values of an indexed nutrient for the first n (default: all) stored products, with missing values filled"""
+    if n is None:
+        n = len(product_ids)
+    values = nutrient_columns[nutrient][:n]
+    return np.where(np.isnan(values), default, values)
+
+def _to_float(value):
+    """Convert a nutrient value for the index (missing or non-numeric become NaN)"""
+    if value is None:
+        return np.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
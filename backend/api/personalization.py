@@ -3,12 +3,142 @@ Personalization API - Fitness-focused personalized recommendations
 """
 
 from flask import Blueprint, request, jsonify
-from datetime import datetime
+from pydantic import ValidationError
+from collections import OrderedDict, namedtuple
+from functools import lru_cache
+from threading import Lock
+from types import MappingProxyType
+import numpy as np
+import logging
+import os
+
+from utils.json_response import encode_json, decode_json
+from utils.timestamps import now_iso
+from utils import score_kernels
+from models.schemas import ProfileIn, RecommendIn, FitnessAnalysisIn, FitnessAnalysisBatchIn, TimingIn
 
 personalization_bp = Blueprint('personalization', __name__)
+log = logging.getLogger(__name__)
 
 # User profiles (would use database in production)
-user_profiles = {}
+# Shared across workers through Redis when REDIS_URL is set, otherwise kept in-process
+# as an LRU bounded by PROFILE_CACHE; request threads share it, so access goes through the lock
+user_profiles = OrderedDict()
+user_profiles_lock = Lock()
+
+PROFILE_CACHE = int(os.getenv('PROFILE_CACHE', 100000))
+
+PROFILE_TTL = int(os.getenv('PROFILE_TTL', 86400))  # seconds
+
+# Recommendation tiers, checked in order - the first match sets the score and message.
+# protein/carbs are minimums, protein_share a minimum fraction of the per-meal protein
+# target, fat_below/sugar_below strict maximums and sugar_above a strict minimum.
+RecommendationTier = namedtuple(
+    'RecommendationTier',
+    ['score', 'message', 'protein', 'protein_share', 'carbs', 'fat_below', 'sugar_below', 'sugar_above'],
+    defaults=(None, None, None, None, None, None, None)
+)
+
+# Workout timing -> (timing advice, tiers)
+TIMING_RULES = {
+    # Pre-workout needs moderate carbs, low fat, moderate protein
+    'pre_workout': ('Consume 30-60 minutes before workout', (
+        RecommendationTier(0.9, 'Excellent pre-workout option', carbs=20, fat_below=5, protein=10),
+        RecommendationTier(0.7, 'Good pre-workout carb source', carbs=15),
+        RecommendationTier(0.4, 'May not provide enough energy for workout'),
+    )),
+    # Post-workout needs high protein, moderate-high carbs
+    'post_workout': ('Consume within 30-45 minutes post-workout', (
+        RecommendationTier(1.0, 'Perfect post-workout recovery food', protein_share=1, carbs=25),
+        RecommendationTier(0.75, 'Good protein source for recovery', protein_share=0.7),
+        RecommendationTier(0.5, 'Protein content low for optimal recovery (need {per_meal_protein}g)'),
+    )),
+    # Recovery needs high protein, low sugar
+    'recovery': ('Suitable for rest days or between workouts', (
+        RecommendationTier(0.9, 'Excellent for muscle recovery', protein=20, sugar_below=10),
+        RecommendationTier(0.7, 'Good recovery snack', protein=15),
+        RecommendationTier(0.5, 'Consider adding protein'),
+    )),
+}
+
+# Fitness goal -> tiers, used for general (non-workout) consumption
+GOAL_RULES = {
+    'muscle_building': (
+        RecommendationTier(0.8, 'Supports muscle building goals', protein_share=0.8),
+        RecommendationTier(0.5, 'Consider supplementing with more protein'),
+    ),
+    'weight_loss': (
+        RecommendationTier(0.9, 'Good for weight loss - high protein, low sugar',
+                           protein=15, sugar_below=10, fat_below=10),
+        RecommendationTier(0.4, 'High sugar content - not ideal for weight loss', sugar_above=20),
+        RecommendationTier(0.6),
+    ),
+}
+
+# Nutrition facts fields fed to the fitness analysis, and calories per gram of each macro
+MACRO_FIELDS = ('protein', 'carbohydrates', 'fat', 'sugar', 'calories')
+MACRO_CALORIES = np.array([4.0, 4.0, 9.0])
+
+# Messages for the fitness_score kernel's bitmasks and use case codes
+FITNESS_STRENGTHS = (
+    (score_kernels.STRENGTH_HIGH_PROTEIN, 'High protein content excellent for muscle growth'),
+    (score_kernels.STRENGTH_GOOD_CARBS, 'Good carb content for energy'),
+    (score_kernels.STRENGTH_PROTEIN_LOW_CAL, 'High protein, low calorie - ideal for weight loss'),
+    (score_kernels.STRENGTH_LOW_SUGAR, 'Low sugar content'),
+    (score_kernels.STRENGTH_LOW_FAT, 'Low fat'),
+)
+
+FITNESS_WEAKNESSES = (
+    (score_kernels.WEAKNESS_HIGH_SUGAR_MUSCLE, 'High sugar - choose complex carbs instead'),
+    (score_kernels.WEAKNESS_LOW_PROTEIN, 'Protein content could be higher for optimal muscle building'),
+    (score_kernels.WEAKNESS_HIGH_SUGAR_WEIGHT, 'High sugar - may hinder weight loss'),
+    (score_kernels.WEAKNESS_HIGH_CALORIE, 'Relatively high calorie'),
+)
+
+BEST_USE_CASES = (
+    'Post-workout recovery meal',
+    'High-protein snack or muscle recovery',
+    'Pre-workout energy source',
+    'General protein supplementation',
+    'General snack - not optimized for fitness',
+)
+
+# Timing recommendations returned by _determine_optimal_timing
+TIMING_POST_WORKOUT = MappingProxyType({
+    'optimal_time': 'Post-workout (within 45 minutes)',
+    'reasoning': 'High protein and carbs support recovery without excess fat slowing digestion',
+    'alternatives': ()
+})
+TIMING_PRE_WORKOUT = MappingProxyType({
+    'optimal_time': 'Pre-workout (30-60 minutes before)',
+    'reasoning': 'Provides quick energy without fat that slows digestion',
+    'alternatives': ('Morning breakfast for energy',)
+})
+TIMING_ANYTIME_PROTEIN = MappingProxyType({
+    'optimal_time': 'Anytime (especially between meals)',
+    'reasoning': 'Lean protein source suitable for muscle maintenance throughout the day',
+    'alternatives': ('Before bed for overnight muscle recovery',)
+})
+TIMING_MORNING = MappingProxyType({
+    'optimal_time': 'Morning or pre-workout',
+    'reasoning': 'High carb content provides sustained energy',
+    'alternatives': ()
+})
+TIMING_GENERAL = MappingProxyType({
+    'optimal_time': 'General consumption',
+    'reasoning': 'Balanced macro profile suitable for regular meals',
+    'alternatives': ()
+})
+
+profile_cache = None
+if os.getenv('REDIS_URL'):
+    try:
+        import redis
+        profile_cache = redis.Redis.from_url(os.getenv('REDIS_URL'))
+        print("✓ Redis profile store configured")
+    except Exception as e:
+        print(f"⚠ Redis profile store not initialized: {e}")
+        print("  User profiles will be kept in-process")
 
 @personalization_bp.route('/profile', methods=['POST'])
 def create_user_profile():
@@ -25,39 +155,42 @@ def create_user_profile():
     Returns:
         Created profile
     """
-    data = request.get_json()
-
-    if not data or 'user_id' not in data:
-        return jsonify({'error': 'User ID required'}), 400
-
-    user_id = data['user_id']
-
-    user_profiles[user_id] = {
-        'user_id': user_id,
-        'fitness_goal': data.get('fitness_goal', 'maintenance'),
-        'workout_schedule': data.get('workout_schedule', {}),
-        'dietary_preferences': data.get('dietary_preferences', {}),
-        'body_metrics': data.get('body_metrics', {}),
-        'created_at': datetime.now().isoformat(),
-        'updated_at': datetime.now().isoformat()
+    try:
+        payload = ProfileIn.model_validate(request.get_json() or {})
+    except ValidationError as e:
+        return _invalid_request(e, 'User ID required')
+
+    now = now_iso()
+
+    profile = {
+        'user_id': payload.user_id,
+        'fitness_goal': payload.fitness_goal,
+        'workout_schedule': payload.workout_schedule,
+        'dietary_preferences': payload.dietary_preferences,
+        # Store only the metrics the client sent; defaults are applied when computing targets
+        'body_metrics': payload.body_metrics.model_dump(exclude_unset=True),
+        'created_at': now,
+        'updated_at': now
     }
 
     # Calculate personalized targets
-    targets = _calculate_nutrition_targets(user_profiles[user_id])
-    user_profiles[user_id]['targets'] = targets
+    profile['targets'] = _calculate_nutrition_targets(payload.body_metrics, payload.fitness_goal)
+    _save_profile(profile)
 
     return jsonify({
         'success': True,
-        'profile': user_profiles[user_id]
+        'profile': profile
     }), 201
 
 @personalization_bp.route('/profile/<user_id>', methods=['GET'])
 def get_user_profile(user_id):
     """Get user profile"""
-    if user_id in user_profiles:
+    profile = _load_profile(user_id)
+
+    if profile is not None:
         return jsonify({
             'success': True,
-            'profile': user_profiles[user_id]
+            'profile': profile
         }), 200
     else:
         return jsonify({
@@ -78,20 +211,19 @@ def get_personalized_recommendations():
     Returns:
         Personalized recommendations
     """
-    data = request.get_json()
+    try:
+        payload = RecommendIn.model_validate(request.get_json() or {})
+    except ValidationError as e:
+        return _invalid_request(e, 'User ID and nutrition facts required')
 
-    if not data or 'user_id' not in data or 'nutrition_facts' not in data:
-        return jsonify({'error': 'User ID and nutrition facts required'}), 400
+    nutrition_facts = payload.nutrition_facts
+    workout_timing = payload.workout_timing
 
-    user_id = data['user_id']
-    nutrition_facts = data['nutrition_facts']
-    workout_timing = data.get('workout_timing', 'general')
+    profile = _load_profile(payload.user_id)
 
-    if user_id not in user_profiles:
+    if profile is None:
         return jsonify({'error': 'User profile not found'}), 404
 
-    profile = user_profiles[user_id]
-
     # Generate personalized recommendations
     recommendations = _generate_personalized_recommendations(
         profile,
@@ -117,20 +249,50 @@ def analyze_for_fitness_goal():
     Returns:
         Detailed fitness-focused analysis
     """
-    data = request.get_json()
+    try:
+        payload = FitnessAnalysisIn.model_validate(request.get_json() or {})
+    except ValidationError as e:
+        return _invalid_request(e, 'Nutrition facts required')
+
+    analysis = _analyze_for_fitness(
+        payload.nutrition_facts,
+        payload.fitness_goal,
+        payload.workout_timing
+    )
 
-    if not data or 'nutrition_facts' not in data:
-        return jsonify({'error': 'Nutrition facts required'}), 400
+    return jsonify({
+        'success': True,
+        'analysis': analysis
+    }), 200
 
-    nutrition_facts = data['nutrition_facts']
-    fitness_goal = data.get('fitness_goal', 'muscle_building')
-    workout_timing = data.get('workout_timing', 'general')
+@personalization_bp.route('/analyze/batch', methods=['POST'])
+def analyze_batch_for_fitness_goal():
+    """
+    Analyze several products (e.g. a grocery list) for one fitness goal
 
-    analysis = _analyze_for_fitness(nutrition_facts, fitness_goal, workout_timing)
+    Expects:
+        - products: List of nutrition_facts dicts (at most MAX_BATCH_SIZE)
+        - fitness_goal
+        - workout_timing (optional)
+
+    Returns:
+        One fitness analysis per product, in request order
+    """
+    try:
+        payload = FitnessAnalysisBatchIn.model_validate(request.get_json() or {})
+    except ValidationError as e:
+        return _invalid_request(e, 'Products required')
+
+    analyses = _analyze_batch(
+        payload.products,
+        payload.fitness_goal,
+        payload.workout_timing
+    )
 
     return jsonify({
         'success': True,
-        'analysis': analysis
+        'count': len(analyses),
+        'analyses': analyses
     }), 200
 
 @personalization_bp.route('/timing', methods=['POST'])
@@ -146,33 +308,92 @@ def get_timing_recommendation():
     Returns:
         Timing-based recommendations
     """
-    data = request.get_json()
-
-    if not data or 'nutrition_facts' not in data:
-        return jsonify({'error': 'Nutrition facts required'}), 400
-
-    nutrition_facts = data['nutrition_facts']
+    try:
+        payload = TimingIn.model_validate(request.get_json() or {})
+    except ValidationError as e:
+        return _invalid_request(e, 'Nutrition facts required')
 
     # Determine optimal consumption timing
-    timing_rec = _determine_optimal_timing(nutrition_facts)
+    timing_rec = _determine_optimal_timing(payload.nutrition_facts)
 
     return jsonify({
         'success': True,
         'timing_recommendation': timing_rec
     }), 200
 
-def _calculate_nutrition_targets(profile):
-    """Calculate personalized nutrition targets based on profile"""
-    body_metrics = profile.get('body_metrics', {})
-    fitness_goal = profile.get('fitness_goal', 'maintenance')
+def _invalid_request(error, missing_message):
+    """400 response for a request body that failed schema validation"""
+    details = error.errors(include_url=False, include_context=False, include_input=False)
+    missing = any(detail['type'] == 'missing' for detail in details)
 
-    weight = body_metrics.get('weight', 70)  # kg
-    height = body_metrics.get('height', 170)  # cm
-    age = body_metrics.get('age', 25)
-    gender = body_metrics.get('gender', 'male')
+    return jsonify({
+        'error': missing_message if missing else 'Invalid request body',
+        'details': details
+    }), 400
+
+def _profile_key(user_id):
+    """Redis key for a user profile"""
+    return f"profile:{user_id}"
+
+def _save_profile(profile):
+    """Store a user profile (overwrites any previous version)"""
+    if profile_cache is not None:
+        try:
+            profile_cache.set(_profile_key(profile['user_id']), encode_json(profile), ex=PROFILE_TTL)
+            return
+        except redis.RedisError as e:
+            log.warning("Redis profile store unavailable, keeping profile in-process: %s", e)
+
+    with user_profiles_lock:
+        user_profiles[profile['user_id']] = profile
+        user_profiles.move_to_end(profile['user_id'])
+        if len(user_profiles) > PROFILE_CACHE:
+            user_profiles.popitem(last=False)
+
+def _load_profile(user_id):
+    """Fetch a user profile, or None if it doesn't exist"""
+    if profile_cache is not None:
+        try:
+            cached = profile_cache.get(_profile_key(user_id))
+            if cached is not None:
+                return decode_json(cached)
+        except redis.RedisError as e:
+            log.warning("Redis profile store unavailable, using in-process profiles: %s", e)
+
+    with user_profiles_lock:
+        profile = user_profiles.get(user_id)
+        if profile is not None:
+            user_profiles.move_to_end(user_id)
+        return profile
+
+def _calculate_nutrition_targets(body_metrics, fitness_goal):
+    """Calculate personalized nutrition targets from validated body metrics"""
+    (daily_calories, daily_protein, daily_carbs, daily_fat,
+     meal_protein, meal_carbs, meal_fat) = _targets_cached(
+        body_metrics.weight,
+        body_metrics.height,
+        body_metrics.age,
+        body_metrics.gender.lower(),
+        fitness_goal
+    )
+
+    return {
+        'daily_calories': daily_calories,
+        'daily_protein': daily_protein,
+        'daily_carbs': daily_carbs,
+        'daily_fat': daily_fat,
+        'per_meal': {
+            'protein': meal_protein,  # 4 meals
+            'carbs': meal_carbs,
+            'fat': meal_fat
+        }
+    }
 
+@lru_cache(maxsize=4096)
+def _targets_cached(weight, height, age, gender, fitness_goal):
+    """Rounded daily and per-meal targets for one set of body metrics"""
     # Calculate BMR (Basal Metabolic Rate) using Mifflin-St Jeor equation
-    if gender.lower() == 'male':
+    if gender == 'male':
         bmr = 10 * weight + 6.25 * height - 5 * age + 5
     else:
         bmr = 10 * weight + 6.25 * height - 5 * age - 161
@@ -201,17 +422,15 @@ def _calculate_nutrition_targets(profile):
     carb_target = (calories * carb_percentage) / 4  # 4 cal per g
     fat_target = (calories * fat_percentage) / 9  # 9 cal per g
 
-    return {
-        'daily_calories': round(calories),
-        'daily_protein': round(protein_target),
-        'daily_carbs': round(carb_target),
-        'daily_fat': round(fat_target),
-        'per_meal': {
-            'protein': round(protein_target / 4),  # 4 meals
-            'carbs': round(carb_target / 4),
-            'fat': round(fat_target / 4)
-        }
-    }
+    return (
+        round(calories),
+        round(protein_target),
+        round(carb_target),
+        round(fat_target),
+        round(protein_target / 4),
+        round(carb_target / 4),
+        round(fat_target / 4)
+    )
 
 def _generate_personalized_recommendations(profile, nutrition_facts, workout_timing):
     """Generate personalized recommendations based on user profile"""
@@ -232,68 +451,20 @@ def _generate_personalized_recommendations(profile, nutrition_facts, workout_tim
 
     per_meal_protein = targets.get('per_meal', {}).get('protein', 25)
 
-    # Evaluate based on workout timing
-    if workout_timing == 'pre_workout':
-        # Pre-workout needs moderate carbs, low fat, moderate protein
-        if carbs >= 20 and fat < 5 and protein >= 10:
-            recommendations['suitability_score'] = 0.9
-            recommendations['messages'].append('Excellent pre-workout option')
-        elif carbs >= 15:
-            recommendations['suitability_score'] = 0.7
-            recommendations['messages'].append('Good pre-workout carb source')
-        else:
-            recommendations['suitability_score'] = 0.4
-            recommendations['messages'].append('May not provide enough energy for workout')
-
-        recommendations['timing'] = 'Consume 30-60 minutes before workout'
-
-    elif workout_timing == 'post_workout':
-        # Post-workout needs high protein, moderate-high carbs
-        if protein >= per_meal_protein and carbs >= 25:
-            recommendations['suitability_score'] = 1.0
-            recommendations['messages'].append('Perfect post-workout recovery food')
-        elif protein >= per_meal_protein * 0.7:
-            recommendations['suitability_score'] = 0.75
-            recommendations['messages'].append('Good protein source for recovery')
-        else:
-            recommendations['suitability_score'] = 0.5
-            recommendations['messages'].append(f'Protein content low for optimal recovery (need {per_meal_protein}g)')
-
-        recommendations['timing'] = 'Consume within 30-45 minutes post-workout'
-
-    elif workout_timing == 'recovery':
-        # Recovery needs high protein, low sugar
-        if protein >= 20 and sugar < 10:
-            recommendations['suitability_score'] = 0.9
-            recommendations['messages'].append('Excellent for muscle recovery')
-        elif protein >= 15:
-            recommendations['suitability_score'] = 0.7
-            recommendations['messages'].append('Good recovery snack')
-        else:
-            recommendations['suitability_score'] = 0.5
-            recommendations['messages'].append('Consider adding protein')
-
-        recommendations['timing'] = 'Suitable for rest days or between workouts'
-
-    else:  # general
-        # Evaluate based on fitness goal
-        if fitness_goal == 'muscle_building':
-            if protein >= per_meal_protein * 0.8:
-                recommendations['suitability_score'] = 0.8
-                recommendations['messages'].append('Supports muscle building goals')
-            else:
-                recommendations['suitability_score'] = 0.5
-                recommendations['messages'].append('Consider supplementing with more protein')
-
-        elif fitness_goal == 'weight_loss':
-            if protein >= 15 and sugar < 10 and fat < 10:
-                recommendations['suitability_score'] = 0.9
-                recommendations['messages'].append('Good for weight loss - high protein, low sugar')
-            elif sugar > 20:
-                recommendations['suitability_score'] = 0.4
-                recommendations['messages'].append('High sugar content - not ideal for weight loss')
-            else:
-                recommendations['suitability_score'] = 0.6
+    # Evaluate based on workout timing, or on fitness goal for general use
+    if workout_timing in TIMING_RULES:
+        recommendations['timing'], tiers = TIMING_RULES[workout_timing]
+    else:
+        tiers = GOAL_RULES.get(fitness_goal, ())
+
+    for tier in tiers:
+        if _tier_matches(tier, protein, carbs, fat, sugar, per_meal_protein):
+            recommendations['suitability_score'] = tier.score
+            if tier.message:
+                recommendations['messages'].append(
+                    tier.message.format(per_meal_protein=per_meal_protein)
+                )
+            break
 
     # Sugar warning
     if sugar > 15:
@@ -301,88 +472,87 @@ def _generate_personalized_recommendations(profile, nutrition_facts, workout_tim
 
     return recommendations
 
+def _tier_matches(tier, protein, carbs, fat, sugar, per_meal_protein):
+    """Check a RecommendationTier's thresholds against a product's macros"""
+    if tier.protein is not None and protein < tier.protein:
+        return False
+    if tier.protein_share is not None and protein < per_meal_protein * tier.protein_share:
+        return False
+    if tier.carbs is not None and carbs < tier.carbs:
+        return False
+    if tier.fat_below is not None and fat >= tier.fat_below:
+        return False
+    if tier.sugar_below is not None and sugar >= tier.sugar_below:
+        return False
+    if tier.sugar_above is not None and sugar <= tier.sugar_above:
+        return False
+    return True
+
 def _analyze_for_fitness(nutrition_facts, fitness_goal, workout_timing):
     """Detailed fitness-focused analysis"""
-    protein = nutrition_facts.get('protein', 0)
-    carbs = nutrition_facts.get('carbohydrates', 0)
-    fat = nutrition_facts.get('fat', 0)
-    sugar = nutrition_facts.get('sugar', 0)
-    calories = nutrition_facts.get('calories', 0)
-
-    analysis = {
-        'fitness_score': 0.0,
-        'macro_breakdown': {},
-        'strengths': [],
-        'weaknesses': [],
-        'best_use_case': ''
-    }
+    macros = _macro_values(nutrition_facts)
+    protein, carbs, fat = macros[:3]
 
     # Calculate macro percentages
+    macro_breakdown = {}
     total_macros = (protein * 4) + (carbs * 4) + (fat * 9)
     if total_macros > 0:
-        analysis['macro_breakdown'] = {
+        macro_breakdown = {
             'protein_percent': round((protein * 4 / total_macros) * 100),
             'carb_percent': round((carbs * 4 / total_macros) * 100),
             'fat_percent': round((fat * 9 / total_macros) * 100)
         }
 
-    # Analyze for muscle building
-    if fitness_goal == 'muscle_building':
-        if protein >= 20:
-            analysis['strengths'].append('High protein content excellent for muscle growth')
-            analysis['fitness_score'] += 40
-
-        if protein >= 10:
-            analysis['fitness_score'] += 20
-
-        if carbs >= 25:
-            analysis['strengths'].append('Good carb content for energy')
-            analysis['fitness_score'] += 20
-
-        if sugar > 20:
-            analysis['weaknesses'].append('High sugar - choose complex carbs instead')
-            analysis['fitness_score'] -= 10
-
-        if protein < 15:
-            analysis['weaknesses'].append('Protein content could be higher for optimal muscle building')
-
-    # Analyze for weight loss
-    elif fitness_goal == 'weight_loss':
-        if protein >= 15 and calories < 200:
-            analysis['strengths'].append('High protein, low calorie - ideal for weight loss')
-            analysis['fitness_score'] += 40
-
-        if sugar < 5:
-            analysis['strengths'].append('Low sugar content')
-            analysis['fitness_score'] += 20
-
-        if fat < 5:
-            analysis['strengths'].append('Low fat')
-            analysis['fitness_score'] += 20
-
-        if sugar > 15:
-            analysis['weaknesses'].append('High sugar - may hinder weight loss')
-            analysis['fitness_score'] -= 20
-
-        if calories > 300:
-            analysis['weaknesses'].append('Relatively high calorie')
-            analysis['fitness_score'] -= 10
-
-    # Determine best use case
-    if protein >= 20 and carbs >= 30:
-        analysis['best_use_case'] = 'Post-workout recovery meal'
-    elif protein >= 20 and sugar < 10:
-        analysis['best_use_case'] = 'High-protein snack or muscle recovery'
-    elif carbs >= 30 and fat < 5:
-        analysis['best_use_case'] = 'Pre-workout energy source'
-    elif protein >= 15:
-        analysis['best_use_case'] = 'General protein supplementation'
-    else:
-        analysis['best_use_case'] = 'General snack - not optimized for fitness'
-
-    analysis['fitness_score'] = max(0, min(100, analysis['fitness_score']))
+    goal_code = score_kernels.GOAL_CODES.get(fitness_goal, score_kernels.GOAL_OTHER)
+    return _fitness_analysis(macros, macro_breakdown, goal_code)
+
+def _analyze_batch(nutrition_facts_list, fitness_goal, workout_timing):
+    """Fitness analysis for many products, with the macro math done as one array pass"""
+    values = np.array([_macro_values(n) for n in nutrition_facts_list], dtype=np.float64)
+    values = values.reshape(-1, len(MACRO_FIELDS))
+
+    # Calories from protein, carbs and fat per product
+    energy = values[:, :3] * MACRO_CALORIES
+    total_macros = energy[:, 0] + energy[:, 1] + energy[:, 2]
+    has_macros = total_macros > 0
+
+    percents = np.zeros_like(energy)
+    np.divide(energy, total_macros[:, None], out=percents, where=has_macros[:, None])
+    percents = np.round(percents * 100).astype(np.int64)
+
+    goal_code = score_kernels.GOAL_CODES.get(fitness_goal, score_kernels.GOAL_OTHER)
+    analyses = []
+    for macros, pct, breakdown_valid in zip(values.tolist(), percents.tolist(), has_macros.tolist()):
+        macro_breakdown = {}
+        if breakdown_valid:
+            macro_breakdown = {
+                'protein_percent': pct[0],
+                'carb_percent': pct[1],
+                'fat_percent': pct[2]
+            }
+        analyses.append(_fitness_analysis(macros, macro_breakdown, goal_code))
+
+    return analyses
+
+def _macro_values(nutrition_facts):
+    """(protein, carbs, fat, sugar, calories) from nutrition facts, 0 when missing"""
+    return tuple(nutrition_facts.get(field, 0) for field in MACRO_FIELDS)
+
+def _fitness_analysis(macros, macro_breakdown, goal_code):
+    """Assemble the analysis dict from the fitness_score kernel's output"""
+    protein, carbs, fat, sugar, calories = macros
+    score, strengths, weaknesses, use_case = score_kernels.fitness_score(
+        float(protein), float(carbs), float(fat), float(sugar), float(calories),
+        goal_code
+    )
 
-    return analysis
+    return {
+        'fitness_score': max(0, min(100, score)),
+        'macro_breakdown': macro_breakdown,
+        'strengths': [msg for bit, msg in FITNESS_STRENGTHS if strengths & bit],
+        'weaknesses': [msg for bit, msg in FITNESS_WEAKNESSES if weaknesses & bit],
+        'best_use_case': BEST_USE_CASES[use_case]
+    }
 
 def _determine_optimal_timing(nutrition_facts):
     """Determine optimal consumption timing based on macro profile"""
@@ -391,36 +561,24 @@ def _determine_optimal_timing(nutrition_facts):
     fat = nutrition_facts.get('fat', 0)
     sugar = nutrition_facts.get('sugar', 0)
 
-    timing = {
-        'optimal_time': '',
-        'reasoning': '',
-        'alternatives': []
-    }
-
     # High protein, moderate carbs, low fat = Post-workout
     if protein >= 20 and carbs >= 20 and fat < 10:
-        timing['optimal_time'] = 'Post-workout (within 45 minutes)'
-        timing['reasoning'] = 'High protein and carbs support recovery without excess fat slowing digestion'
+        template = TIMING_POST_WORKOUT
 
     # Moderate carbs, low fat = Pre-workout
     elif carbs >= 20 and fat < 5:
-        timing['optimal_time'] = 'Pre-workout (30-60 minutes before)'
-        timing['reasoning'] = 'Provides quick energy without fat that slows digestion'
-        timing['alternatives'].append('Morning breakfast for energy')
+        template = TIMING_PRE_WORKOUT
 
     # High protein, low carbs/fat = Anytime protein
     elif protein >= 15 and carbs < 15 and fat < 10:
-        timing['optimal_time'] = 'Anytime (especially between meals)'
-        timing['reasoning'] = 'Lean protein source suitable for muscle maintenance throughout the day'
-        timing['alternatives'].append('Before bed for overnight muscle recovery')
+        template = TIMING_ANYTIME_PROTEIN
 
     # High carbs, moderate protein = Morning or pre-workout
     elif carbs >= 30:
-        timing['optimal_time'] = 'Morning or pre-workout'
-        timing['reasoning'] = 'High carb content provides sustained energy'
+        template = TIMING_MORNING
 
     else:
-        timing['optimal_time'] = 'General consumption'
-        timing['reasoning'] = 'Balanced macro profile suitable for regular meals'
+        template = TIMING_GENERAL
 
-    return timing
+    # Shallow copy - the templates are shared and read-only
+    return dict(template)
@@ -3,35 +3,48 @@ Scan API - Handle food label image uploads and processing
 Architecture: Tesseract for extraction, AI for analysis, FSSAI/WHO for compliance
 """
 
-from flask import Blueprint, request, jsonify
-from werkzeug.utils import secure_filename
+from flask import Blueprint, Response, request, jsonify
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, as_completed
+from functools import lru_cache, wraps
+import logging
 import os
-import sys
-from pathlib import Path
-
-# Add parent directory to path for imports
-sys.path.append(str(Path(__file__).parent.parent))
 
 from services.ocr_service import OCRService, validated_results
 from services.fssai_service import FSSAIService
+from utils.json_response import ndjson_response
 
 scan_bp = Blueprint('scan', __name__)
+log = logging.getLogger(__name__)
 
 # Configuration
-UPLOAD_FOLDER = 'uploads'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'bmp'}
-
-# Ensure upload folder exists
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+_ALLOWED_SUFFIXES = tuple(f'.{ext}' for ext in ALLOWED_EXTENSIONS)
+MAX_BATCH_IMAGES = 16
 
 # Initialize services
-ocr_service = OCRService()
-fssai_service = FSSAIService()
+ocr_service = OCRService.get_instance()
+fssai_service = FSSAIService.get_instance()
+
+# Shared pool for the ingredient analysis a scan runs alongside its report
+# (the report itself runs in the request thread). One worker per gunicorn
+# thread, so a scan's call never waits in the queue behind other scans
+ai_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('AI_WORKERS', os.getenv('GUNICORN_THREADS', 8))),
+    thread_name_prefix='gemini'
+)
+AI_TIMEOUT = float(os.getenv('AI_TIMEOUT', 60))  # seconds to wait for the offloaded Gemini result
+
+# Shared pool for OCR-ing the images of a batch scan in parallel
+# (Tesseract runs as a subprocess and OpenCV releases the GIL)
+scan_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('SCAN_WORKERS', os.cpu_count() or 2)),
+    thread_name_prefix='ocr'
+)
 
 # Initialize Gemini AI (optional - with fallback)
 try:
     from services.gemini_service import GeminiService
-    gemini_service = GeminiService()
+    gemini_service = GeminiService.get_instance()
     USE_GEMINI = True
     print("✓ Gemini AI initialized successfully (for reports & recommendations)")
 except Exception as e:
@@ -42,8 +55,48 @@ except Exception as e:
 
 def allowed_file(filename):
     """Check if file extension is allowed"""
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    return filename.lower().endswith(_ALLOWED_SUFFIXES)
+
+GEMINI_NOT_CONFIGURED = 'Gemini AI not configured'
+
+def gemini_endpoint(*required_keys, missing_message,
+                    unavailable_message=GEMINI_NOT_CONFIGURED):
+    """
+    Wrap a JSON endpoint that forwards to Gemini
+
+    Returns 503 before the body is parsed when Gemini isn't configured and
+    400 when a required key is missing; otherwise the handler receives the
+    parsed JSON and its return value is sent back as a 200 response (or
+    returned as is when the handler already built a Response, e.g. a stream).
+    """
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper():
+            if not USE_GEMINI:
+                return jsonify({
+                    'success': False,
+                    'error': unavailable_message
+                }), 503
+
+            data = request.get_json()
+
+            if not data or any(key not in data for key in required_keys):
+                return jsonify({'error': missing_message}), 400
+
+            try:
+                result = handler(data)
+                if isinstance(result, Response):
+                    return result
+                return jsonify(result), 200
+
+            except Exception as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 500
+
+        return wrapper
+    return decorator
 
 @scan_bp.route('/', methods=['POST'])
 def scan_label():
@@ -58,21 +111,22 @@ def scan_label():
     Expects:
         - image file in multipart/form-data
         - optional: claims (list of claims made on packaging)
+        - optional: ?include_raw=1 to return the raw OCR text
 
     Returns:
         - Extracted nutrition data (Tesseract)
         - FSSAI/WHO compliance verification (actual rules)
         - AI-generated insights & recommendations (Gemini - if available)
     """
-    print(f"DEBUG: Received request - Files: {request.files.keys()}, Form: {request.form.keys()}")
+    log.debug("Received request - Files: %s, Form: %s", request.files.keys(), request.form.keys())
 
     # Check if image is in request
     if 'image' not in request.files:
-        print("DEBUG: No 'image' in request.files")
+        log.debug("No 'image' in request.files")
         return jsonify({'error': 'No image file provided'}), 400
 
     file = request.files['image']
-    print(f"DEBUG: File received: {file.filename}")
+    log.debug("File received: %s", file.filename)
 
     if file.filename == '':
         return jsonify({'error': 'No file selected'}), 400
@@ -81,17 +135,15 @@ def scan_label():
         return jsonify({'error': 'Invalid file type. Allowed: png, jpg, jpeg, gif, bmp'}), 400
 
     try:
-        # Save uploaded file
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(filepath)
+        # Read the upload straight from the request stream
+        image_data = file.read()
 
         # ============================================
         # STEP 1: Extract text using Tesseract OCR
         # ============================================
-        print(f"DEBUG: Step 1 - Extracting text with Tesseract OCR")
+        log.debug("Step 1 - Extracting text with Tesseract OCR")
 
-        ocr_result = ocr_service.process_food_label(filepath)
+        ocr_result = ocr_service.process_food_label_bytes(image_data)
         nutrition_data = ocr_result.get('nutrition_facts', {})
         ingredients = ocr_result.get('ingredients', [])
         raw_text = ocr_result.get('raw_text', '')
@@ -101,12 +153,21 @@ def scan_label():
         claims = request.form.getlist('claims') if 'claims' in request.form else []
         ocr_confidence = ocr_result.get('confidence', {})
 
-        print(f"DEBUG: Extracted nutrition data: {nutrition_data}")
+        log.debug("Extracted nutrition data: %s", nutrition_data)
+
+        # Ingredient safety analysis only needs the OCR output, so start the
+        # Gemini call now and let it run while FSSAI verification happens locally
+        ingredient_future = None
+        if USE_GEMINI and ingredients:
+            ingredient_future = ai_executor.submit(
+                gemini_service.analyze_ingredients_safety,
+                ingredients
+            )
 
         # ============================================
         # STEP 2: Verify with ACTUAL FSSAI/WHO rules
         # ============================================
-        print(f"DEBUG: Step 2 - Verifying with FSSAI/WHO regulations")
+        log.debug("Step 2 - Verifying with FSSAI/WHO regulations")
 
         fssai_verification = fssai_service.verify_all_claims(nutrition_data, claims)
 
@@ -121,7 +182,7 @@ def scan_label():
         ai_insights = {}
 
         if USE_GEMINI:
-            print(f"DEBUG: Step 3 - Generating AI insights with Gemini")
+            log.debug("Step 3 - Generating AI insights with Gemini")
 
             try:
                 # Prepare complete nutrition data with metadata for AI
@@ -133,7 +194,7 @@ def scan_label():
                     'ingredients': ingredients
                 }
 
-                # Generate comprehensive AI report
+                # Generate comprehensive AI report (runs alongside the ingredient analysis)
                 report_result = gemini_service.generate_comprehensive_report(
                     complete_nutrition_data,
                     fssai_verification
@@ -142,16 +203,22 @@ def scan_label():
                     ai_insights['comprehensive_report'] = report_result['report']
 
                 # Analyze ingredients safety
-                if ingredients:
-                    ingredient_analysis = gemini_service.analyze_ingredients_safety(ingredients)
-                    if ingredient_analysis['success']:
-                        ai_insights['ingredient_analysis'] = ingredient_analysis['analysis']
+                if ingredient_future is not None:
+                    try:
+                        ingredient_analysis = ingredient_future.result(timeout=AI_TIMEOUT)
+                    except FutureTimeoutError:
+                        ingredient_future.cancel()
+                        log.warning("Ingredient analysis timed out after %ss", AI_TIMEOUT)
+                        ai_insights['error'] = 'Ingredient analysis timed out'
+                    else:
+                        if ingredient_analysis['success']:
+                            ai_insights['ingredient_analysis'] = ingredient_analysis['analysis']
 
             except Exception as e:
-                print(f"DEBUG: AI insights generation failed: {e}")
+                log.warning("AI insights generation failed: %s", e)
                 ai_insights['error'] = str(e)
         else:
-            print(f"DEBUG: Step 3 - Skipped (Gemini not configured)")
+            log.debug("Step 3 - Skipped (Gemini not configured)")
 
         # ============================================
         # Compile response
@@ -167,7 +234,8 @@ def scan_label():
                 'serving_size': serving_size,
                 'net_weight': net_weight,
                 'servings_per_container': servings_per_container,
-                'raw_text': raw_text,
+                # Raw OCR text is the largest field - only sent when asked for
+                'raw_text': raw_text if request.args.get('include_raw') == '1' else None,
                 'confidence': ocr_confidence
             },
 
@@ -191,19 +259,10 @@ def scan_label():
             )
         }
 
-        # Clean up uploaded file
-        os.remove(filepath)
-
         return jsonify(response), 200
 
     except Exception as e:
-        # Clean up file if it exists
-        if 'filepath' in locals() and os.path.exists(filepath):
-            os.remove(filepath)
-
-        print(f"ERROR: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log.exception("Scan failed: %s", e)
 
         return jsonify({
             'success': False,
@@ -211,45 +270,117 @@ def scan_label():
             'message': 'Error processing image. Please ensure the label is clear and well-lit.'
         }), 500
 
-@scan_bp.route('/ai-report', methods=['POST'])
-def generate_ai_report():
+@scan_bp.route('/batch', methods=['POST'])
+def scan_multiple_labels():
     """
-    Generate AI report for already extracted nutrition data
+    Scan several food labels in one request
+
+    Images are OCR'd in parallel and verified against FSSAI/WHO rules in
+    one batch call. AI insights are not generated here - use /ai-report
+    on individual results.
 
     Expects:
-        - JSON with nutrition_data, fssai_verification, user_profile (optional)
+        - images: up to MAX_BATCH_IMAGES image files in multipart/form-data
+        - optional: claims (list of claims, applied to every image)
 
     Returns:
-        - AI-generated comprehensive report
+        - One result per image, in upload order
     """
-    if not USE_GEMINI:
-        return jsonify({
-            'success': False,
-            'error': 'Gemini AI not configured. Please add GEMINI_API_KEY to environment.'
-        }), 503
+    files = request.files.getlist('images') or request.files.getlist('images[]')
+
+    if not files:
+        return jsonify({'error': 'No image files provided'}), 400
+
+    if len(files) > MAX_BATCH_IMAGES:
+        return jsonify({'error': f'At most {MAX_BATCH_IMAGES} images per batch'}), 400
+
+    claims = request.form.getlist('claims')
+    results = [None] * len(files)
+
+    # STEP 1: OCR every valid image in parallel
+    futures = {}
+    for index, file in enumerate(files):
+        if not file.filename or not allowed_file(file.filename):
+            results[index] = {
+                'filename': file.filename,
+                'success': False,
+                'error': 'Invalid file type. Allowed: png, jpg, jpeg, gif, bmp'
+            }
+            continue
+
+        future = scan_executor.submit(ocr_service.process_food_label_bytes, file.read())
+        futures[future] = index
+
+    ocr_results = {}
+    for future in as_completed(futures):
+        index = futures[future]
+        try:
+            ocr_results[index] = future.result()
+        except Exception as e:
+            log.error("Batch scan of %s failed: %s", files[index].filename, e)
+            results[index] = {
+                'filename': files[index].filename,
+                'success': False,
+                'error': str(e)
+            }
+
+    # STEP 2: Verify all extracted products in one FSSAI batch call
+    indexes = sorted(ocr_results)
+    verifications = fssai_service.verify_all_claims_batch(
+        [ocr_results[index].get('nutrition_facts', {}) for index in indexes],
+        [claims] * len(indexes)
+    )
+
+    for index, fssai_verification in zip(indexes, verifications):
+        results[index] = _batch_scan_result(
+            files[index].filename,
+            ocr_results[index],
+            fssai_verification
+        )
 
-    data = request.get_json()
+    return jsonify({
+        'success': True,
+        'total': len(files),
+        'processed': len(indexes),
+        'results': results
+    }), 200
 
-    if not data or 'nutrition_data' not in data:
-        return jsonify({'error': 'Nutrition data required'}), 400
+@scan_bp.route('/ai-report', methods=['POST'])
+@gemini_endpoint('nutrition_data', missing_message='Nutrition data required',
+                 unavailable_message=GEMINI_NOT_CONFIGURED + '. Please add GEMINI_API_KEY to environment.')
+def generate_ai_report(data):
+    """
+    Generate AI report for already extracted nutrition data
 
-    try:
-        report_result = gemini_service.generate_comprehensive_report(
-            data['nutrition_data'],
-            data.get('fssai_verification', {}),
-            data.get('user_profile')
-        )
+    Expects:
+        - JSON with nutrition_data, fssai_verification, user_profile (optional)
 
-        return jsonify(report_result), 200
+    Optional: ?stream=1 streams the report as NDJSON ({"delta": ...} lines,
+    then a final {"success": true, "done": true} line)
 
-    except Exception as e:
-        return jsonify({
-            'success': False,
-            'error': str(e)
-        }), 500
+    Returns:
+        - AI-generated comprehensive report
+    """
+    if request.args.get('stream') == '1':
+        return ndjson_response(_stream_lines(
+            gemini_service.generate_comprehensive_report_stream(
+                data['nutrition_data'],
+                data.get('fssai_verification', {}),
+                data.get('user_profile')
+            ),
+            'Error generating report'
+        ))
+
+    return gemini_service.generate_comprehensive_report(
+        data['nutrition_data'],
+        data.get('fssai_verification', {}),
+        data.get('user_profile')
+    )
 
 @scan_bp.route('/ai-recommend', methods=['POST'])
-def get_ai_recommendation():
+@gemini_endpoint('nutrition_data', 'user_profile',
+                 missing_message='nutrition_data and user_profile required')
+def get_ai_recommendation(data):
     """
     Get personalized AI recommendation
 
@@ -259,34 +390,15 @@ def get_ai_recommendation():
     Returns:
         - AI-generated personalized recommendation
     """
-    if not USE_GEMINI:
-        return jsonify({
-            'success': False,
-            'error': 'Gemini AI not configured'
-        }), 503
-
-    data = request.get_json()
-
-    if not data or 'nutrition_data' not in data or 'user_profile' not in data:
-        return jsonify({'error': 'nutrition_data and user_profile required'}), 400
-
-    try:
-        recommendation = gemini_service.generate_personalized_recommendation(
-            data['nutrition_data'],
-            data['user_profile'],
-            data.get('workout_timing', 'general')
-        )
-
-        return jsonify(recommendation), 200
-
-    except Exception as e:
-        return jsonify({
-            'success': False,
-            'error': str(e)
-        }), 500
+    return gemini_service.generate_personalized_recommendation(
+        data['nutrition_data'],
+        data['user_profile'],
+        data.get('workout_timing', 'general')
+    )
 
 @scan_bp.route('/ai-compare', methods=['POST'])
-def compare_products_ai():
+@gemini_endpoint('products', missing_message='Products array required')
+def compare_products_ai(data):
     """
     Compare products using AI
 
@@ -296,29 +408,11 @@ def compare_products_ai():
     Returns:
         - AI-generated comparison
     """
-    if not USE_GEMINI:
-        return jsonify({
-            'success': False,
-            'error': 'Gemini AI not configured'
-        }), 503
-
-    data = request.get_json()
-
-    if not data or 'products' not in data:
-        return jsonify({'error': 'Products array required'}), 400
-
-    try:
-        comparison = gemini_service.compare_products_ai(data['products'])
-        return jsonify(comparison), 200
-
-    except Exception as e:
-        return jsonify({
-            'success': False,
-            'error': str(e)
-        }), 500
+    return gemini_service.compare_products_ai(data['products'])
 
 @scan_bp.route('/ai-ingredients', methods=['POST'])
-def analyze_ingredients():
+@gemini_endpoint('ingredients', missing_message='Ingredients array required')
+def analyze_ingredients(data):
     """
     Analyze ingredient safety using AI
 
@@ -328,64 +422,40 @@ def analyze_ingredients():
     Returns:
         - AI safety analysis
     """
-    if not USE_GEMINI:
-        return jsonify({
-            'success': False,
-            'error': 'Gemini AI not configured'
-        }), 503
-
-    data = request.get_json()
-
-    if not data or 'ingredients' not in data:
-        return jsonify({'error': 'Ingredients array required'}), 400
-
-    try:
-        analysis = gemini_service.analyze_ingredients_safety(data['ingredients'])
-        return jsonify(analysis), 200
-
-    except Exception as e:
-        return jsonify({
-            'success': False,
-            'error': str(e)
-        }), 500
+    return gemini_service.analyze_ingredients_safety(data['ingredients'])
 
 @scan_bp.route('/ai-ask', methods=['POST'])
-def ask_nutrition_question():
+@gemini_endpoint('question', missing_message='Question required')
+def ask_nutrition_question(data):
     """
     Ask nutrition questions to AI
 
     Expects:
         - JSON with question and optional context
 
+    Optional: ?stream=1 streams the answer as NDJSON (same format as /ai-report)
+
     Returns:
         - AI answer
     """
-    if not USE_GEMINI:
-        return jsonify({
-            'success': False,
-            'error': 'Gemini AI not configured'
-        }), 503
-
-    data = request.get_json()
-
-    if not data or 'question' not in data:
-        return jsonify({'error': 'Question required'}), 400
-
-    try:
-        answer = gemini_service.answer_nutrition_question(
-            data['question'],
-            data.get('context')
-        )
-        return jsonify(answer), 200
-
-    except Exception as e:
-        return jsonify({
-            'success': False,
-            'error': str(e)
-        }), 500
+    if request.args.get('stream') == '1':
+        return ndjson_response(_stream_lines(
+            gemini_service.answer_nutrition_question_stream(
+                data['question'],
+                data.get('context')
+            ),
+            'Error answering question'
+        ))
+
+    return gemini_service.answer_nutrition_question(
+        data['question'],
+        data.get('context')
+    )
 
 @scan_bp.route('/alternatives', methods=['POST'])
-def get_healthier_alternatives():
+@gemini_endpoint('nutrition_data', missing_message='Nutrition data required',
+                 unavailable_message=GEMINI_NOT_CONFIGURED + '. Please add GEMINI_API_KEY to environment.')
+def get_healthier_alternatives(data):
     """
     Get healthier alternative product suggestions
 
@@ -393,34 +463,26 @@ def get_healthier_alternatives():
         - JSON with nutrition_data, fssai_verification
         - Optional: user_profile
 
+    Optional: ?stream=1 streams the suggestions as NDJSON (same format as /ai-report)
+
     Returns:
         - AI-generated healthier alternatives
     """
-    if not USE_GEMINI:
-        return jsonify({
-            'success': False,
-            'error': 'Gemini AI not configured. Please add GEMINI_API_KEY to environment.'
-        }), 503
-
-    data = request.get_json()
-
-    if not data or 'nutrition_data' not in data:
-        return jsonify({'error': 'Nutrition data required'}), 400
-
-    try:
-        alternatives = gemini_service.generate_healthier_alternatives(
-            data['nutrition_data'],
-            data.get('fssai_verification', {}),
-            data.get('user_profile')
-        )
-
-        return jsonify(alternatives), 200
-
-    except Exception as e:
-        return jsonify({
-            'success': False,
-            'error': str(e)
-        }), 500
+    if request.args.get('stream') == '1':
+        return ndjson_response(_stream_lines(
+            gemini_service.generate_healthier_alternatives_stream(
+                data['nutrition_data'],
+                data.get('fssai_verification', {}),
+                data.get('user_profile')
+            ),
+            'Error generating alternatives'
+        ))
+
+    return gemini_service.generate_healthier_alternatives(
+        data['nutrition_data'],
+        data.get('fssai_verification', {}),
+        data.get('user_profile')
+    )
 
 @scan_bp.route('/validate', methods=['POST'])
 def validate_manual_entry():
@@ -456,35 +518,91 @@ def validate_manual_entry():
             'error': str(e)
         }), 500
 
+def _stream_lines(chunks, error_prefix: str):
+    """NDJSON payloads for a streamed Gemini response: text deltas, then a final status"""
+    try:
+        for text in chunks:
+            yield {'delta': text}
+    except Exception as e:
+        yield {'success': False, 'error': f'{error_prefix}: {str(e)}'}
+        return
+
+    yield {'success': True, 'done': True, 'generated_by': 'gemini-2.0-flash'}
+
+def _batch_scan_result(filename: str, ocr_result: dict, fssai_verification: dict) -> dict:
+    """Per-image entry of a batch scan response (extraction, compliance, recommendation)"""
+    ingredients = ocr_result.get('ingredients', [])
+    ocr_confidence = ocr_result.get('confidence', {})
+
+    return {
+        'filename': filename,
+        'success': True,
+        'extraction': {
+            'source': 'tesseract-ocr',
+            'nutrition_data': ocr_result.get('nutrition_facts', {}),
+            'ingredients': ingredients,
+            'serving_size': ocr_result.get('serving_size'),
+            'net_weight': ocr_result.get('net_weight'),
+            'servings_per_container': ocr_result.get('servings_per_container'),
+            'confidence': ocr_confidence
+        },
+        'compliance': {
+            'fssai_verification': fssai_verification,
+            'allergen_info': fssai_service.detect_allergens(ingredients) if ingredients else {},
+            'source': 'fssai-who-regulations'
+        },
+        'recommendation': _generate_recommendation(
+            ocr_confidence.get('overall', 0.0),
+            fssai_verification
+        )
+    }
+
 def _generate_recommendation(confidence: float, fssai_verification: dict) -> dict:
     """Generate user-facing recommendation based on confidence and compliance"""
-    compliance = fssai_verification.get('overall_compliance', True)
+    compliance = bool(fssai_verification.get('overall_compliance', True))
     trust_score = fssai_verification.get('trust_score', 1.0)
 
+    level, message, action, warnings = _recommendation_for(
+        _threshold_band(confidence),
+        compliance,
+        _threshold_band(trust_score)
+    )
+
     recommendation = {
-        'level': 'unknown',
-        'message': '',
-        'action': ''
+        'level': level,
+        'message': message,
+        'action': action
     }
 
+    # Add specific warnings
+    if warnings:
+        recommendation['warnings'] = list(warnings)
+
+    return recommendation
+
+def _threshold_band(score: float) -> int:
+    """Bucket a 0-1 score by the recommendation thresholds: 0 (<0.6), 1 (<0.8) or 2"""
+    return (score >= 0.6) + (score >= 0.8)
+
+@lru_cache(maxsize=None)
+def _recommendation_for(confidence_band: int, compliance: bool, trust_band: int) -> tuple:
+    """(level, message, action, warnings) for a combination of threshold bands"""
     # Determine recommendation level
-    if confidence >= 0.8 and compliance and trust_score >= 0.8:
-        recommendation['level'] = 'high'
-        recommendation['message'] = 'Data extraction reliable and claims verified'
-        recommendation['action'] = 'Safe to use this nutritional information'
+    if confidence_band == 2 and compliance and trust_band == 2:
+        level = 'high'
+        message = 'Data extraction reliable and claims verified'
+        action = 'Safe to use this nutritional information'
 
-    elif confidence >= 0.6 and trust_score >= 0.6:
-        recommendation['level'] = 'medium'
-        recommendation['message'] = 'Data extraction partially reliable'
-        recommendation['action'] = 'Review the nutrition facts and verify manually if needed'
+    elif confidence_band >= 1 and trust_band >= 1:
+        level = 'medium'
+        message = 'Data extraction partially reliable'
+        action = 'Review the nutrition facts and verify manually if needed'
 
     else:
-        recommendation['level'] = 'low'
-        recommendation['message'] = 'Low confidence in data extraction or compliance issues detected'
-        recommendation['action'] = 'Manual verification recommended or try rescanning with better lighting'
+        level = 'low'
+        message = 'Low confidence in data extraction or compliance issues detected'
+        action = 'Manual verification recommended or try rescanning with better lighting'
 
-    # Add specific warnings
-    if not compliance:
-        recommendation['warnings'] = ['Some nutritional claims may not meet FSSAI standards']
+    warnings = () if compliance else ('Some nutritional claims may not meet FSSAI standards',)
 
-    return recommendation
+    return level, message, action, warnings
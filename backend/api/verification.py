@@ -3,17 +3,14 @@ Verification API - FSSAI and WHO compliance verification endpoints
 """
 
 from flask import Blueprint, request, jsonify
-import sys
-from pathlib import Path
-
-sys.path.append(str(Path(__file__).parent.parent))
 
+from models.schemas import MAX_BATCH_SIZE
 from services.fssai_service import FSSAIService
 
 verification_bp = Blueprint('verification', __name__)
 
 # Initialize service
-fssai_service = FSSAIService()
+fssai_service = FSSAIService.get_instance()
 
 @verification_bp.route('/fssai', methods=['POST'])
 def verify_fssai_compliance():
@@ -49,6 +46,47 @@ def verify_fssai_compliance():
             'error': str(e)
         }), 500
 
+@verification_bp.route('/fssai/batch', methods=['POST'])
+def verify_fssai_compliance_batch():
+    """
+    Verify FSSAI compliance for several products in one request
+
+    Expects:
+        - products: List of {nutrition_facts, claims (optional)}
+
+    Returns:
+        One FSSAI verification result per product, in request order
+    """
+    data = request.get_json()
+
+    if not isinstance(data, dict) or not isinstance(data.get('products'), list) or not data['products']:
+        return jsonify({'error': 'No products provided'}), 400
+
+    products = data['products']
+    if len(products) > MAX_BATCH_SIZE:
+        return jsonify({'error': f'At most {MAX_BATCH_SIZE} products per batch'}), 400
+
+    if any(not isinstance(p, dict) or 'nutrition_facts' not in p for p in products):
+        return jsonify({'error': 'Each product needs nutrition_facts'}), 400
+
+    try:
+        verifications = fssai_service.verify_all_claims_batch(
+            [p['nutrition_facts'] for p in products],
+            [p.get('claims', []) for p in products]
+        )
+
+        return jsonify({
+            'success': True,
+            'count': len(verifications),
+            'verifications': verifications
+        }), 200
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @verification_bp.route('/protein', methods=['POST'])
 def verify_protein_claim():
     """
@@ -3,33 +3,73 @@ PackCheck - AI-Powered Food Label Verification System
 Main application entry point
 """
 
-from flask import Flask, jsonify, request
+from flask import Flask, abort, jsonify, request
 from flask_cors import CORS
 from dotenv import load_dotenv
+import logging
 import os
 
 # Load environment variables
 load_dotenv()
 
+# Request-path debug output is logged at DEBUG; set LOG_LEVEL=DEBUG to see it
+logging.basicConfig(
+    level=os.getenv('LOG_LEVEL', 'INFO').upper(),
+    format='%(asctime)s %(levelname)s %(name)s: %(message)s'
+)
+
 # Import API blueprints
 from api.scan import scan_bp
 from api.nutrition import nutrition_bp
 from api.verification import verification_bp
 from api.personalization import personalization_bp
 from api.community import community_bp
+from models.database import remove_db_session
+from utils.json_response import init_json
+from utils.uploads import InMemoryUploadRequest
 
 def create_app():
     """Application factory pattern"""
     app = Flask(__name__)
+    app.request_class = InMemoryUploadRequest
 
     # Configuration
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key')
     app.config['DATABASE_URL'] = os.getenv('DATABASE_URL', 'postgresql://localhost/packcheck')
     app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+    app.config['MAX_JSON_LENGTH'] = int(os.getenv('MAX_JSON_LENGTH', 256 * 1024))  # non-upload routes
+
+    # Serialize JSON with orjson when it is installed
+    init_json(app)
 
     # Enable CORS
     CORS(app, resources={r"/api/*": {"origins": "*"}})
 
+    # Compress JSON responses (scan results carry the full OCR text)
+    app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+    app.config['COMPRESS_BR_LEVEL'] = 4
+    app.config['COMPRESS_MIN_SIZE'] = 500
+    try:
+        from flask_compress import Compress
+        Compress(app)
+    except ImportError:
+        print("⚠ Flask-Compress not installed - responses will be sent uncompressed")
+
+    # Only image uploads may use the full MAX_CONTENT_LENGTH; every other route
+    # is JSON and is held to MAX_JSON_LENGTH. Checked against Content-Length
+    # before any of the body is read.
+    upload_endpoints = {'scan.scan_label', 'scan.scan_multiple_labels', 'test_upload'}
+
+    @app.before_request
+    def limit_request_size():
+        if request.endpoint in upload_endpoints:
+            return
+        if (request.content_length or 0) > app.config['MAX_JSON_LENGTH']:
+            abort(413)
+
+    # Hand each request's database session back to the pool
+    app.teardown_appcontext(remove_db_session)
+
     # Register blueprints
     app.register_blueprint(scan_bp, url_prefix='/api/scan')
     app.register_blueprint(nutrition_bp, url_prefix='/api/nutrition')
@@ -63,8 +103,8 @@ def create_app():
     # Test endpoint for debugging uploads
     @app.route('/api/test-upload', methods=['POST'])
     def test_upload():
-        print(f"DEBUG Test - Request files: {request.files}")
-        print(f"DEBUG Test - Request form: {request.form}")
+        app.logger.debug("Test - Request files: %s", request.files)
+        app.logger.debug("Test - Request form: %s", request.form)
         return jsonify({
             'received': 'ok',
             'files_received': list(request.files.keys()),
@@ -76,6 +116,10 @@ def create_app():
     def not_found(error):
         return jsonify({'error': 'Endpoint not found'}), 404
 
+    @app.errorhandler(413)
+    def request_too_large(error):
+        return jsonify({'error': 'Request body too large'}), 413
+
     @app.errorhandler(500)
     def internal_error(error):
         return jsonify({'error': 'Internal server error'}), 500
@@ -0,0 +1,28 @@
+"""
+Gunicorn configuration for the PackCheck API
+
+Used by start.sh, the Dockerfile and railway.json:
+    gunicorn -c gunicorn.conf.py app:app
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', 5000)}"
+
+# Threaded workers: scans spend most of their time waiting on Tesseract
+# subprocesses and Gemini calls, which release the GIL, so threads overlap them.
+# (gevent is not used - the Gemini SDK talks gRPC, which doesn't cooperate
+# with gevent's monkey-patching, and OCR preprocessing is CPU-bound)
+worker_class = 'gthread'
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+
+# Import the app (OCR/FSSAI services, Gemini client) once in the master and
+# fork it into workers copy-on-write; nothing opens sockets at import time.
+# In-memory stores (nutrition, community, profiles) are copied empty into each
+# worker and diverge from there, so anything identifying a worker's state
+# (e.g. the ETag prefix in utils/http_cache.py) is derived after the fork
+preload_app = True
+
+timeout = 120
+keepalive = 5
@@ -2,14 +2,18 @@
 Database models for PackCheck
 """
 
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Boolean, JSON, ForeignKey, Text
+from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Boolean, JSON, ForeignKey, Text, Index
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import sessionmaker, scoped_session, relationship
 from datetime import datetime
 import os
 
 Base = declarative_base()
 
+# JSONB on Postgres (indexable, binary storage), plain JSON elsewhere
+JSONType = JSON().with_variant(JSONB(), 'postgresql')
+
 class User(Base):
     """User profile model"""
     __tablename__ = 'users'
@@ -36,7 +40,7 @@ class UserProfile(Base):
     __tablename__ = 'user_profiles'
 
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
 
     # Workout schedule (JSON)
     workout_schedule = Column(JSON)
@@ -65,10 +69,10 @@ class Product(Base):
     name = Column(String(255))
     brand = Column(String(255))
     category = Column(String(100))
-    barcode = Column(String(50))
+    barcode = Column(String(50), index=True)
 
     # Nutrition facts (JSON)
-    nutrition_facts = Column(JSON)
+    nutrition_facts = Column(JSONType)
 
     # Ingredients
     ingredients = Column(Text)
@@ -88,6 +92,10 @@ class Product(Base):
     # Relationships
     scans = relationship("Scan", back_populates="product")
 
+    __table_args__ = (
+        Index('ix_products_nutrition_facts', 'nutrition_facts', postgresql_using='gin').ddl_if(dialect='postgresql'),
+    )
+
 class Scan(Base):
     """Scan history model"""
     __tablename__ = 'scans'
@@ -96,12 +104,12 @@ class Scan(Base):
     scan_id = Column(String(100), unique=True, nullable=False)
 
     # Foreign keys
-    user_id = Column(Integer, ForeignKey('users.id'))
-    product_id = Column(Integer, ForeignKey('products.id'))
+    user_id = Column(Integer, ForeignKey('users.id'))  # indexed with scanned_at below
+    product_id = Column(Integer, ForeignKey('products.id'), index=True)
 
     # Scan data
     image_path = Column(String(500))
-    ocr_results = Column(JSON)
+    ocr_results = Column(JSONType)
     confidence_scores = Column(JSON)
 
     # FSSAI verification results
@@ -118,6 +126,12 @@ class Scan(Base):
     user = relationship("User", back_populates="scans")
     product = relationship("Product", back_populates="scans")
 
+    __table_args__ = (
+        # Per-user scan history, newest first
+        Index('ix_scans_user_scanned_at', 'user_id', 'scanned_at'),
+        Index('ix_scans_ocr_results', 'ocr_results', postgresql_using='gin').ddl_if(dialect='postgresql'),
+    )
+
 class CommunityVerification(Base):
     """Community verification submissions"""
     __tablename__ = 'community_verifications'
@@ -126,8 +140,8 @@ class CommunityVerification(Base):
     verification_id = Column(String(100), unique=True, nullable=False)
 
     # Foreign keys
-    product_id = Column(Integer, ForeignKey('products.id'))
-    user_id = Column(Integer, ForeignKey('users.id'))
+    product_id = Column(Integer, ForeignKey('products.id'), index=True)
+    user_id = Column(Integer, ForeignKey('users.id'), index=True)
 
     # Verification data
     verification_type = Column(String(50))  # confirm, correct, flag
@@ -162,28 +176,52 @@ class NutritionLog(Base):
     total_sugar = Column(Float, default=0)
 
     # Meal breakdown (JSON)
-    meals = Column(JSON)
+    meals = Column(JSONType)
 
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        # Daily lookups are always by user and date; also serves user_id alone
+        Index('ix_nutrition_logs_user_date', 'user_id', 'log_date'),
+        Index('ix_nutrition_logs_meals', 'meals', postgresql_using='gin').ddl_if(dialect='postgresql'),
+    )
+
+# Shared engine and session registry
+def _create_engine(database_url):
+    """Create an engine with a connection pool sized for the web workers"""
+    if database_url.startswith('sqlite'):
+        return create_engine(database_url, pool_pre_ping=True)
+
+    return create_engine(
+        database_url,
+        pool_size=int(os.getenv('DB_POOL_SIZE', 20)),
+        max_overflow=int(os.getenv('DB_MAX_OVERFLOW', 10)),
+        pool_pre_ping=True
+    )
+
+engine = _create_engine(os.getenv('DATABASE_URL', 'sqlite:///packcheck.db'))
+SessionLocal = scoped_session(sessionmaker(bind=engine, expire_on_commit=False))
+
 # Database initialization
 def init_db(database_url=None):
     """Initialize database and create tables"""
     if database_url is None:
-        database_url = os.getenv('DATABASE_URL', 'postgresql://localhost/packcheck')
+        Base.metadata.create_all(engine)
+        return SessionLocal()
 
-    engine = create_engine(database_url)
-    Base.metadata.create_all(engine)
+    db_engine = create_engine(database_url)
+    Base.metadata.create_all(db_engine)
 
-    Session = sessionmaker(bind=engine)
+    Session = sessionmaker(bind=db_engine)
     return Session()
 
 # Database session helper
 def get_db_session():
-    """Get database session"""
-    database_url = os.getenv('DATABASE_URL', 'sqlite:///packcheck.db')
-    engine = create_engine(database_url)
-    Session = sessionmaker(bind=engine)
-    return Session()
+    """Get the current thread's database session (reuses the shared pool)"""
+    return SessionLocal()
+
+def remove_db_session(exception=None):
+    """Close the current thread's session and return its connection to the pool"""
+    SessionLocal.remove()
@@ -0,0 +1,51 @@
+"""
+Request schemas for PackCheck API endpoints
+"""
+
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Dict, List, Union
+
+Number = Union[int, float]
+UserId = Union[str, int]
+
+# Max products accepted by batch endpoints
+MAX_BATCH_SIZE = 100
+
+class BodyMetrics(BaseModel):
+    """Body metrics used for nutrition targets (defaults used when not provided)"""
+    model_config = ConfigDict(extra='allow')
+
+    weight: Number = 70  # kg
+    height: Number = 170  # cm
+    age: Number = 25
+    gender: str = 'male'
+
+class ProfileIn(BaseModel):
+    """Payload for creating or updating a user profile"""
+    user_id: UserId
+    fitness_goal: str = 'maintenance'
+    workout_schedule: Dict = Field(default_factory=dict)
+    dietary_preferences: Dict = Field(default_factory=dict)
+    body_metrics: BodyMetrics = Field(default_factory=BodyMetrics)
+
+class RecommendIn(BaseModel):
+    """Payload for personalized product recommendations"""
+    user_id: UserId
+    nutrition_facts: Dict
+    workout_timing: str = 'general'
+
+class FitnessAnalysisIn(BaseModel):
+    """Payload for fitness goal analysis"""
+    nutrition_facts: Dict
+    fitness_goal: str = 'muscle_building'
+    workout_timing: str = 'general'
+
+class FitnessAnalysisBatchIn(BaseModel):
+    """Payload for analyzing several products against one fitness goal"""
+    products: List[Dict] = Field(min_length=1, max_length=MAX_BATCH_SIZE)
+    fitness_goal: str = 'muscle_building'
+    workout_timing: str = 'general'
+
+class TimingIn(BaseModel):
+    """Payload for workout timing recommendations"""
+    nutrition_facts: Dict
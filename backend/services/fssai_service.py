@@ -3,56 +3,179 @@ FSSAI Compliance Verification Service
 Implements regulatory verification for Indian food packaging standards
 """
 
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set
+from collections import OrderedDict
+from calendar import monthrange
 from datetime import datetime, timedelta
+from threading import Lock
+import json
+import os
 import re
 
-class FSSAIService:
+import numpy as np
+
+from services.singleton import SingletonMixin
+
+# Optional: pyahocorasick matches all allergen keywords in one linear pass
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# Expiry date formats accepted by verify_expiry_date:
+# DD/MM/YYYY or DD-MM-YYYY, MM/YYYY, and "Mon YYYY" / "Month YYYY"
+_EXPIRY_DAY_MONTH_YEAR = re.compile(r'([0-9]{1,2})([/-])([0-9]{1,2})\2(\d{4})')
+_EXPIRY_MONTH_YEAR = re.compile(r'([0-9]{1,2})/(\d{4})')
+_EXPIRY_NAMED_MONTH_YEAR = re.compile(r'([A-Za-z]+)\s+(\d{4})')
+
+_MONTHS = {
+    name: number
+    for number, (abbr, full) in enumerate([
+        ('jan', 'january'), ('feb', 'february'), ('mar', 'march'),
+        ('apr', 'april'), ('may', 'may'), ('jun', 'june'),
+        ('jul', 'july'), ('aug', 'august'), ('sep', 'september'),
+        ('oct', 'october'), ('nov', 'november'), ('dec', 'december')
+    ], start=1)
+    for name in (abbr, full)
+}
+
+# Claim phrases checked against FSSAI thresholds (substring match, any case).
+# The lookahead finds overlapping phrases too, e.g. both in "low sugar free"
+_CLAIM_PHRASE_RE = re.compile(
+    '(?=(high protein|source of protein|low sugar|sugar free|low fat|fat free|low sodium))'
+)
+
+def _claim_phrases(claims: List[str]) -> Set[str]:
+    """Recognized claim phrases appearing in any of the claims"""
+    # Newline-joined so no phrase can match across two claims
+    return set(_CLAIM_PHRASE_RE.findall('\n'.join(claims).lower()))
+
+# Max verify_all_claims results kept (re-scans of the same product are common)
+VERIFICATION_CACHE_SIZE = int(os.getenv('FSSAI_CACHE_SIZE', 4096))
+
+def _allergen_matcher(allergen_by_keyword: Dict[str, str]):
+    """Build a function returning the set of allergens whose keywords occur in a text"""
+    if ahocorasick is not None:
+        automaton = ahocorasick.Automaton()
+        for keyword, allergen in allergen_by_keyword.items():
+            automaton.add_word(keyword, allergen)
+        automaton.make_automaton()
+        return lambda text: {allergen for _, allergen in automaton.iter(text)}
+
+    # One pattern over all keywords; the lookahead keeps overlapping
+    # keywords (e.g. "almondairy") visible
+    pattern = re.compile('(?=(' + '|'.join(map(re.escape, allergen_by_keyword)) + '))')
+    return lambda text: {allergen_by_keyword[kw] for kw in pattern.findall(text)}
+
+# FSSAI Standards
+HIGH_PROTEIN_THRESHOLD = 10.0  # g per serving
+SOURCE_OF_PROTEIN_THRESHOLD = 5.0  # g per serving
+HIGH_FIBER_THRESHOLD = 6.0  # g per serving
+SOURCE_OF_FIBER_THRESHOLD = 3.0  # g per serving
+LOW_SUGAR_THRESHOLD = 5.0  # g per 100g
+SUGAR_FREE_THRESHOLD = 0.5  # g per 100g
+LOW_FAT_THRESHOLD = 3.0  # g per 100g
+FAT_FREE_THRESHOLD = 0.5  # g per 100g
+LOW_SODIUM_THRESHOLD = 120  # mg per 100g
+VERY_LOW_SODIUM_THRESHOLD = 40  # mg per 100g
+TRANS_FAT_MAX_THRESHOLD = 2.2  # g per serving
+
+# WHO Standards
+DAILY_SODIUM_LIMIT = 5000  # mg/day
+DAILY_SUGAR_LIMIT = 25000  # mg/day (25g)
+DAILY_TRANS_FAT_LIMIT = 2200  # mg/day (2.2g)
+
+def _trust_table(penalties) -> tuple:
+    """Trust score for every failure bitmask (bit i set = check i failed)"""
+    table = []
+    for mask in range(1 << len(penalties)):
+        trust_score = 1.0
+        # Multiply in check order so scores match applying the penalties one by one
+        for bit, (_, penalty) in enumerate(penalties):
+            if mask & (1 << bit):
+                trust_score *= penalty
+        table.append(trust_score)
+    return tuple(table)
+
+class FSSAIService(SingletonMixin):
     """Service for FSSAI regulatory compliance verification"""
 
-    # FSSAI Standards
+    # FSSAI Standards (as reported by the standards endpoint; the checks use
+    # the module constants above directly)
     FSSAI_STANDARDS = {
         'protein': {
-            'high_protein_threshold': 10.0,  # g per serving
-            'source_of_protein_threshold': 5.0,  # g per serving
+            'high_protein_threshold': HIGH_PROTEIN_THRESHOLD,
+            'source_of_protein_threshold': SOURCE_OF_PROTEIN_THRESHOLD,
             'unit': 'g'
         },
         'fiber': {
-            'high_fiber_threshold': 6.0,  # g per serving
-            'source_of_fiber_threshold': 3.0,  # g per serving
+            'high_fiber_threshold': HIGH_FIBER_THRESHOLD,
+            'source_of_fiber_threshold': SOURCE_OF_FIBER_THRESHOLD,
             'unit': 'g'
         },
         'sugar': {
-            'low_sugar_threshold': 5.0,  # g per 100g
-            'sugar_free_threshold': 0.5,  # g per 100g
+            'low_sugar_threshold': LOW_SUGAR_THRESHOLD,
+            'sugar_free_threshold': SUGAR_FREE_THRESHOLD,
             'unit': 'g'
         },
         'fat': {
-            'low_fat_threshold': 3.0,  # g per 100g
-            'fat_free_threshold': 0.5,  # g per 100g
+            'low_fat_threshold': LOW_FAT_THRESHOLD,
+            'fat_free_threshold': FAT_FREE_THRESHOLD,
             'unit': 'g'
         },
         'sodium': {
-            'low_sodium_threshold': 120,  # mg per 100g
-            'very_low_sodium_threshold': 40,  # mg per 100g
+            'low_sodium_threshold': LOW_SODIUM_THRESHOLD,
+            'very_low_sodium_threshold': VERY_LOW_SODIUM_THRESHOLD,
             'unit': 'mg'
         },
         'trans_fat': {
-            'max_threshold': 2.2,  # g per serving
+            'max_threshold': TRANS_FAT_MAX_THRESHOLD,
             'unit': 'g'
         }
     }
 
     # WHO Standards
     WHO_STANDARDS = {
-        'daily_sodium_limit': 5000,  # mg/day
-        'daily_sugar_limit': 25000,  # mg/day (25g)
-        'daily_trans_fat_limit': 2200  # mg/day (2.2g)
+        'daily_sodium_limit': DAILY_SODIUM_LIMIT,
+        'daily_sugar_limit': DAILY_SUGAR_LIMIT,
+        'daily_trans_fat_limit': DAILY_TRANS_FAT_LIMIT
     }
 
+    # Allergen -> ingredient keywords (substring match, case-insensitive)
+    COMMON_ALLERGENS = {
+        'milk': ('milk', 'dairy', 'lactose', 'whey', 'casein'),
+        'eggs': ('egg', 'albumin'),
+        'peanuts': ('peanut', 'groundnut'),
+        'tree_nuts': ('almond', 'cashew', 'walnut', 'pistachio'),
+        'soy': ('soy', 'soya'),
+        'wheat': ('wheat', 'gluten'),
+        'fish': ('fish',),
+        'shellfish': ('shrimp', 'crab', 'lobster')
+    }
+
+    # Trust score factor applied when a nutrient check fails, in application order
+    _TRUST_PENALTIES = (
+        ('protein', 0.5),
+        ('sugar', 0.7),
+        ('fat', 0.7),
+        ('sodium', 0.8),
+        ('trans_fat', 0.6)
+    )
+    _TRUST_BY_FAILURES = _trust_table(_TRUST_PENALTIES)
+
+    # Keyword -> allergen, matched in a single pass over the ingredient text
+    _ALLERGEN_BY_KEYWORD = {
+        keyword: allergen
+        for allergen, keywords in COMMON_ALLERGENS.items()
+        for keyword in keywords
+    }
+    _match_allergens = staticmethod(_allergen_matcher(_ALLERGEN_BY_KEYWORD))
+
     def __init__(self):
         """Initialize FSSAI service"""
-        self.verification_cache = {}
+        # LRU of verify_all_claims results keyed on the canonical input
+        self.verification_cache = OrderedDict()
+        self._cache_lock = Lock()
 
     def verify_protein_claim(self, protein_content: float,
                             serving_size: float = 100.0,
@@ -80,8 +203,10 @@ class FSSAIService:
             'trust_score': 0.0
         }
 
-        if claim and 'high protein' in claim.lower():
-            threshold = self.FSSAI_STANDARDS['protein']['high_protein_threshold']
+        claim_lower = claim.lower() if claim else ''
+
+        if 'high protein' in claim_lower:
+            threshold = HIGH_PROTEIN_THRESHOLD
             result['standard'] = f"FSSAI High Protein (≥{threshold}g per serving)"
 
             if protein_per_serving >= threshold:
@@ -93,8 +218,8 @@ class FSSAIService:
                 result['trust_score'] = 0.3
                 result['message'] = f"✗ Product claims 'High Protein' but contains only {protein_per_serving}g (requires ≥{threshold}g per serving)"
 
-        elif claim and 'source of protein' in claim.lower():
-            threshold = self.FSSAI_STANDARDS['protein']['source_of_protein_threshold']
+        elif 'source of protein' in claim_lower:
+            threshold = SOURCE_OF_PROTEIN_THRESHOLD
             result['standard'] = f"FSSAI Source of Protein (≥{threshold}g per serving)"
 
             if protein_per_serving >= threshold:
@@ -113,7 +238,7 @@ class FSSAIService:
             result['message'] = f"Product contains {protein_per_serving}g protein per serving (no claim made)"
 
             # Add helpful context
-            high_threshold = self.FSSAI_STANDARDS['protein']['high_protein_threshold']
+            high_threshold = HIGH_PROTEIN_THRESHOLD
             if protein_per_serving >= high_threshold:
                 result['message'] += f" - Qualifies as 'High Protein' by FSSAI standards"
 
@@ -128,80 +253,218 @@ class FSSAIService:
             claims: List of claims made on packaging
 
         Returns:
-            Comprehensive verification results
+            Comprehensive verification results (shared with the cache, so
+            callers must not modify it)
         """
         if claims is None:
             claims = []
 
-        results = {
-            'overall_compliance': True,
-            'trust_score': 1.0,
-            'verifications': {},
-            'warnings': [],
-            'recommendations': []
-        }
+        key = self._verification_key(nutrition_data, claims)
+        if key is not None:
+            with self._cache_lock:
+                cached = self.verification_cache.get(key)
+                if cached is not None:
+                    self.verification_cache.move_to_end(key)
+                    return cached
+
+        results = self._verify_all_claims(nutrition_data, claims)
+
+        if key is not None:
+            with self._cache_lock:
+                self.verification_cache[key] = results
+                if len(self.verification_cache) > VERIFICATION_CACHE_SIZE:
+                    self.verification_cache.popitem(last=False)
+
+        return results
+
+    def _verification_key(self, nutrition_data: Dict, claims: List[str]) -> Optional[str]:
+        """Canonical cache key for a verification, or None if the input can't be keyed"""
+        # Claim order is kept: the first protein claim found is the one verified
+        try:
+            return json.dumps([nutrition_data, claims], sort_keys=True)
+        except (TypeError, ValueError):
+            return None
+
+    def _verify_all_claims(self, nutrition_data: Dict, claims: List[str]) -> Dict:
+        """Run every claim check for one product (uncached)"""
+        found_claims = _claim_phrases(claims)
+        verifications = {}
 
         # Verify protein claims
         if 'protein' in nutrition_data:
             protein_claim = next((c for c in claims if 'protein' in c.lower()), None)
-            protein_result = self.verify_protein_claim(
+            verifications['protein'] = self.verify_protein_claim(
                 nutrition_data['protein'],
                 claim=protein_claim
             )
-            results['verifications']['protein'] = protein_result
 
-            if not protein_result['compliant']:
-                results['overall_compliance'] = False
-                results['trust_score'] *= 0.5
-
-        # Verify sugar content
+        # Verify sugar, fat and sodium content
         if 'sugar' in nutrition_data:
-            sugar_result = self._verify_sugar_content(nutrition_data['sugar'], claims)
-            results['verifications']['sugar'] = sugar_result
+            verifications['sugar'] = self._verify_sugar_content(nutrition_data['sugar'], found_claims)
+        if 'fat' in nutrition_data:
+            verifications['fat'] = self._verify_fat_content(nutrition_data['fat'], found_claims)
+        if 'sodium' in nutrition_data:
+            verifications['sodium'] = self._verify_sodium_content(nutrition_data['sodium'], found_claims)
 
-            if not sugar_result['compliant']:
-                results['overall_compliance'] = False
-                results['trust_score'] *= 0.7
+        # Check trans fat
+        if 'trans_fat' in nutrition_data:
+            verifications['trans_fat'] = self._verify_trans_fat(nutrition_data['trans_fat'])
 
-        # Verify fat content
-        if 'fat' in nutrition_data:
-            fat_result = self._verify_fat_content(nutrition_data['fat'], claims)
-            results['verifications']['fat'] = fat_result
+        # Bitmask of failed checks; the trust score comes from one table lookup
+        failures = 0
+        for bit, (nutrient, _) in enumerate(self._TRUST_PENALTIES):
+            check = verifications.get(nutrient)
+            if check is not None and not check['compliant']:
+                failures |= 1 << bit
 
-            if not fat_result['compliant']:
-                results['overall_compliance'] = False
-                results['trust_score'] *= 0.7
+        warnings = []
+        if 'trans_fat' in verifications and not verifications['trans_fat']['compliant']:
+            warnings.append("Trans fat exceeds FSSAI limits")
 
-        # Verify sodium content
-        if 'sodium' in nutrition_data:
-            sodium_result = self._verify_sodium_content(nutrition_data['sodium'], claims)
-            results['verifications']['sodium'] = sodium_result
+        return {
+            'overall_compliance': failures == 0,
+            'trust_score': self._TRUST_BY_FAILURES[failures],
+            'verifications': verifications,
+            'warnings': warnings,
+            'recommendations': self._generate_recommendations(nutrition_data, verifications),
+            # WHO compliance check
+            'who_compliance': self._check_who_compliance(nutrition_data)
+        }
 
-            if not sodium_result['compliant']:
-                results['overall_compliance'] = False
-                results['trust_score'] *= 0.8
+    def verify_all_claims_batch(self, nutrition_data_list: List[Dict],
+                                claims_list: List[List[str]] = None) -> List[Dict]:
+        """
+        Verify several products in one call
 
-        # Check trans fat
-        if 'trans_fat' in nutrition_data:
-            trans_fat_result = self._verify_trans_fat(nutrition_data['trans_fat'])
-            results['verifications']['trans_fat'] = trans_fat_result
+        Args:
+            nutrition_data_list: Nutritional values for each product
+            claims_list: Claims for each product, aligned with nutrition_data_list
 
-            if not trans_fat_result['compliant']:
-                results['overall_compliance'] = False
-                results['trust_score'] *= 0.6
-                results['warnings'].append("Trans fat exceeds FSSAI limits")
+        Returns:
+            One verify_all_claims result per product, in input order
+        """
+        if claims_list is None:
+            claims_list = [None] * len(nutrition_data_list)
 
-        # WHO compliance check
-        who_compliance = self._check_who_compliance(nutrition_data)
-        results['who_compliance'] = who_compliance
+        if len(claims_list) != len(nutrition_data_list):
+            raise ValueError("claims_list must have one entry per product")
 
-        # Generate recommendations
-        results['recommendations'] = self._generate_recommendations(nutrition_data, results['verifications'])
+        verify = self.verify_all_claims
+        return [
+            verify(nutrition_data, claims)
+            for nutrition_data, claims in zip(nutrition_data_list, claims_list)
+        ]
 
-        return results
+    # Nutrient columns used by verify_compliance_arrays
+    _BATCH_NUTRIENTS = ('protein', 'sugar', 'fat', 'sodium', 'trans_fat')
 
-    def _verify_sugar_content(self, sugar_content: float, claims: List[str]) -> Dict:
-        """Verify sugar-related claims"""
+    def verify_compliance_arrays(self, nutrition_data_list: List[Dict],
+                                 claims_list: List[List[str]] = None) -> Dict[str, np.ndarray]:
+        """
+        Vectorized compliance summary for many products (e.g. catalog ingest)
+
+        Applies the same rules as verify_all_claims but only returns the
+        outcome, as one array per field instead of one dict per product.
+
+        Args:
+            nutrition_data_list: Nutritional values for each product
+            claims_list: Claims for each product, aligned with nutrition_data_list
+
+        Returns:
+            'overall_compliance' (bool) and 'trust_score' (float) arrays, a
+            bool array per nutrient check (True where compliant or not present),
+            and the WHO daily-limit percentages for sodium and sugar (NaN where
+            not present) with a 'who_warning' flag
+        """
+        count = len(nutrition_data_list)
+        if claims_list is None:
+            claims_list = [None] * count
+
+        if len(claims_list) != count:
+            raise ValueError("claims_list must have one entry per product")
+
+        nutrients = self._BATCH_NUTRIENTS
+        values = np.array(
+            [[data.get(n, np.nan) for n in nutrients] for data in nutrition_data_list],
+            dtype=float
+        ).reshape(count, len(nutrients))
+        present = np.array(
+            [[n in data for n in nutrients] for data in nutrition_data_list],
+            dtype=bool
+        ).reshape(count, len(nutrients))
+        flags = np.array(
+            [self._claim_flags(claims or []) for claims in claims_list],
+            dtype=bool
+        ).reshape(count, 7)
+
+        protein, sugar, fat, sodium, trans_fat = values.T
+        (high_protein, source_protein, low_sugar, sugar_free,
+         low_fat, fat_free, low_sodium) = flags.T
+
+        # NaN (not present) compares False, so absent nutrients pass every check
+        protein_ok = ~np.where(
+            high_protein,
+            protein < HIGH_PROTEIN_THRESHOLD,
+            source_protein & (protein < SOURCE_OF_PROTEIN_THRESHOLD)
+        )
+        sugar_ok = ~np.where(
+            low_sugar,
+            sugar > LOW_SUGAR_THRESHOLD,
+            sugar_free & (sugar > SUGAR_FREE_THRESHOLD)
+        )
+        fat_ok = ~np.where(
+            low_fat,
+            fat > LOW_FAT_THRESHOLD,
+            fat_free & (fat > FAT_FREE_THRESHOLD)
+        )
+        sodium_ok = ~(low_sodium & (sodium > LOW_SODIUM_THRESHOLD))
+        trans_fat_ok = ~present[:, 4] | (trans_fat <= TRANS_FAT_MAX_THRESHOLD)
+
+        checks = {
+            'protein': protein_ok,
+            'sugar': sugar_ok,
+            'fat': fat_ok,
+            'sodium': sodium_ok,
+            'trans_fat': trans_fat_ok
+        }
+
+        # Same failure bitmask and trust table as verify_all_claims
+        failures = np.zeros(count, dtype=np.intp)
+        for bit, (nutrient, _) in enumerate(self._TRUST_PENALTIES):
+            failures |= (~checks[nutrient]).astype(np.intp) << bit
+        trust_score = np.asarray(self._TRUST_BY_FAILURES)[failures]
+
+        # Same arithmetic as _check_who_compliance
+        who_sodium_pct = (sodium / DAILY_SODIUM_LIMIT) * 100
+        who_sugar_pct = ((sugar * 1000) / DAILY_SUGAR_LIMIT) * 100
+
+        return {
+            'overall_compliance': failures == 0,
+            'trust_score': trust_score,
+            **checks,
+            'who_sodium_pct': who_sodium_pct,
+            'who_sugar_pct': who_sugar_pct,
+            'who_warning': (who_sodium_pct > 20) | (who_sugar_pct > 25)
+        }
+
+    def _claim_flags(self, claims: List[str]) -> tuple:
+        """Which checkable claims a product makes, matching verify_all_claims' parsing"""
+        found = _claim_phrases(claims)
+        # Only the first protein claim is verified
+        protein_claim = next((c for c in claims if 'protein' in c.lower()), '').lower()
+        high_protein = 'high protein' in protein_claim
+        return (
+            high_protein,
+            not high_protein and 'source of protein' in protein_claim,
+            'low sugar' in found,
+            'sugar free' in found,
+            'low fat' in found,
+            'fat free' in found,
+            'low sodium' in found
+        )
+
+    def _verify_sugar_content(self, sugar_content: float, found_claims: Set[str]) -> Dict:
+        """Verify sugar-related claims (found_claims: phrases from _claim_phrases)"""
         result = {
             'compliant': True,
             'actual_value': sugar_content,
@@ -209,11 +472,11 @@ class FSSAIService:
             'trust_score': 1.0
         }
 
-        low_sugar_claim = any('low sugar' in c.lower() for c in claims)
-        sugar_free_claim = any('sugar free' in c.lower() for c in claims)
+        low_sugar_claim = 'low sugar' in found_claims
+        sugar_free_claim = 'sugar free' in found_claims
 
         if low_sugar_claim:
-            threshold = self.FSSAI_STANDARDS['sugar']['low_sugar_threshold']
+            threshold = LOW_SUGAR_THRESHOLD
             if sugar_content <= threshold:
                 result['message'] = f"✓ Product meets 'Low Sugar' standard"
             else:
@@ -222,7 +485,7 @@ class FSSAIService:
                 result['message'] = f"✗ Product claims 'Low Sugar' but contains {sugar_content}g (requires ≤{threshold}g per 100g)"
 
         elif sugar_free_claim:
-            threshold = self.FSSAI_STANDARDS['sugar']['sugar_free_threshold']
+            threshold = SUGAR_FREE_THRESHOLD
             if sugar_content <= threshold:
                 result['message'] = f"✓ Product meets 'Sugar Free' standard"
             else:
@@ -232,8 +495,8 @@ class FSSAIService:
 
         return result
 
-    def _verify_fat_content(self, fat_content: float, claims: List[str]) -> Dict:
-        """Verify fat-related claims"""
+    def _verify_fat_content(self, fat_content: float, found_claims: Set[str]) -> Dict:
+        """Verify fat-related claims (found_claims: phrases from _claim_phrases)"""
         result = {
             'compliant': True,
             'actual_value': fat_content,
@@ -241,11 +504,11 @@ class FSSAIService:
             'trust_score': 1.0
         }
 
-        low_fat_claim = any('low fat' in c.lower() for c in claims)
-        fat_free_claim = any('fat free' in c.lower() for c in claims)
+        low_fat_claim = 'low fat' in found_claims
+        fat_free_claim = 'fat free' in found_claims
 
         if low_fat_claim:
-            threshold = self.FSSAI_STANDARDS['fat']['low_fat_threshold']
+            threshold = LOW_FAT_THRESHOLD
             if fat_content <= threshold:
                 result['message'] = f"✓ Product meets 'Low Fat' standard"
             else:
@@ -254,7 +517,7 @@ class FSSAIService:
                 result['message'] = f"✗ Product claims 'Low Fat' but contains {fat_content}g"
 
         elif fat_free_claim:
-            threshold = self.FSSAI_STANDARDS['fat']['fat_free_threshold']
+            threshold = FAT_FREE_THRESHOLD
             if fat_content <= threshold:
                 result['message'] = f"✓ Product meets 'Fat Free' standard"
             else:
@@ -264,8 +527,8 @@ class FSSAIService:
 
         return result
 
-    def _verify_sodium_content(self, sodium_content: float, claims: List[str]) -> Dict:
-        """Verify sodium-related claims"""
+    def _verify_sodium_content(self, sodium_content: float, found_claims: Set[str]) -> Dict:
+        """Verify sodium-related claims (found_claims: phrases from _claim_phrases)"""
         result = {
             'compliant': True,
             'actual_value': sodium_content,
@@ -273,10 +536,10 @@ class FSSAIService:
             'trust_score': 1.0
         }
 
-        low_sodium_claim = any('low sodium' in c.lower() for c in claims)
+        low_sodium_claim = 'low sodium' in found_claims
 
         if low_sodium_claim:
-            threshold = self.FSSAI_STANDARDS['sodium']['low_sodium_threshold']
+            threshold = LOW_SODIUM_THRESHOLD
             if sodium_content <= threshold:
                 result['message'] = f"✓ Product meets 'Low Sodium' standard"
             else:
@@ -288,7 +551,7 @@ class FSSAIService:
 
     def _verify_trans_fat(self, trans_fat_content: float) -> Dict:
         """Verify trans fat content against FSSAI limits"""
-        threshold = self.FSSAI_STANDARDS['trans_fat']['max_threshold']
+        threshold = TRANS_FAT_MAX_THRESHOLD
 
         result = {
             'compliant': trans_fat_content <= threshold,
@@ -314,10 +577,9 @@ class FSSAIService:
         # Check sodium against WHO daily limit
         if 'sodium' in nutrition_data:
             sodium = nutrition_data['sodium']
-            daily_limit = self.WHO_STANDARDS['daily_sodium_limit']
 
             # Assume per serving - calculate percentage of daily limit
-            sodium_percentage = (sodium / daily_limit) * 100
+            sodium_percentage = (sodium / DAILY_SODIUM_LIMIT) * 100
 
             if sodium_percentage > 20:  # >20% of daily limit per serving
                 compliance['warnings'].append(
@@ -327,9 +589,8 @@ class FSSAIService:
         # Check sugar against WHO daily limit
         if 'sugar' in nutrition_data:
             sugar = nutrition_data['sugar'] * 1000  # Convert to mg
-            daily_limit = self.WHO_STANDARDS['daily_sugar_limit']
 
-            sugar_percentage = (sugar / daily_limit) * 100
+            sugar_percentage = (sugar / DAILY_SUGAR_LIMIT) * 100
 
             if sugar_percentage > 25:  # >25% of daily limit per serving
                 compliance['warnings'].append(
@@ -362,12 +623,14 @@ class FSSAIService:
 
         return recommendations
 
-    def verify_expiry_date(self, expiry_date_str: str) -> Dict:
+    def verify_expiry_date(self, expiry_date_str: str, now: Optional[datetime] = None) -> Dict:
         """
         Verify expiry date validity
 
         Args:
             expiry_date_str: Expiry date string from label
+            now: Reference time (defaults to datetime.now(); pass one value
+                when checking many dates together)
 
         Returns:
             Verification result
@@ -379,42 +642,52 @@ class FSSAIService:
             'message': ''
         }
 
-        # Try to parse various date formats
-        date_formats = [
-            '%d/%m/%Y',
-            '%d-%m-%Y',
-            '%m/%Y',
-            '%b %Y',
-            '%B %Y'
-        ]
-
-        for fmt in date_formats:
-            try:
-                expiry_date = datetime.strptime(expiry_date_str.strip(), fmt)
-                result['expiry_date'] = expiry_date.isoformat()
+        expiry_date = self._parse_expiry_date(expiry_date_str.strip())
 
-                today = datetime.now()
-                days_remaining = (expiry_date - today).days
+        if expiry_date is None:
+            result['message'] = "Could not parse expiry date"
+            return result
 
-                result['days_remaining'] = days_remaining
-                result['valid'] = days_remaining >= 0
+        result['expiry_date'] = expiry_date.isoformat()
 
-                if days_remaining < 0:
-                    result['message'] = f"⚠ Product expired {abs(days_remaining)} days ago"
-                elif days_remaining < 30:
-                    result['message'] = f"⚠ Product expires soon ({days_remaining} days remaining)"
-                else:
-                    result['message'] = f"✓ Product valid ({days_remaining} days remaining)"
+        today = now if now is not None else datetime.now()
+        days_remaining = (expiry_date - today).days
 
-                break
-            except ValueError:
-                continue
+        result['days_remaining'] = days_remaining
+        result['valid'] = days_remaining >= 0
 
-        if not result['expiry_date']:
-            result['message'] = "Could not parse expiry date"
+        if days_remaining < 0:
+            result['message'] = f"⚠ Product expired {abs(days_remaining)} days ago"
+        elif days_remaining < 30:
+            result['message'] = f"⚠ Product expires soon ({days_remaining} days remaining)"
+        else:
+            result['message'] = f"✓ Product valid ({days_remaining} days remaining)"
 
         return result
 
+    def _parse_expiry_date(self, text: str) -> Optional[datetime]:
+        """Parse an expiry date in one of the supported label formats, or None"""
+        match = _EXPIRY_DAY_MONTH_YEAR.fullmatch(text)
+        if match:
+            day, month, year = int(match.group(1)), int(match.group(3)), int(match.group(4))
+        else:
+            day = 1
+            match = _EXPIRY_MONTH_YEAR.fullmatch(text)
+            if match:
+                month, year = int(match.group(1)), int(match.group(2))
+            else:
+                match = _EXPIRY_NAMED_MONTH_YEAR.fullmatch(text)
+                if not match or match.group(1).lower() not in _MONTHS:
+                    return None
+                month, year = _MONTHS[match.group(1).lower()], int(match.group(2))
+
+        # Reject impossible dates (e.g. 31/02/2025, month 13) up front
+        # instead of letting datetime() raise
+        if not (1 <= year and 1 <= month <= 12 and 1 <= day <= monthrange(year, month)[1]):
+            return None
+
+        return datetime(year, month, day)
+
     def detect_allergens(self, ingredients: List[str]) -> Dict:
         """
         Detect common allergens in ingredient list
@@ -425,26 +698,12 @@ class FSSAIService:
         Returns:
             Detected allergens
         """
-        common_allergens = {
-            'milk': ['milk', 'dairy', 'lactose', 'whey', 'casein'],
-            'eggs': ['egg', 'albumin'],
-            'peanuts': ['peanut', 'groundnut'],
-            'tree_nuts': ['almond', 'cashew', 'walnut', 'pistachio'],
-            'soy': ['soy', 'soya'],
-            'wheat': ['wheat', 'gluten'],
-            'fish': ['fish'],
-            'shellfish': ['shrimp', 'crab', 'lobster']
-        }
-
-        detected_allergens = []
-
         ingredients_lower = ' '.join(ingredients).lower()
 
-        for allergen, keywords in common_allergens.items():
-            for keyword in keywords:
-                if keyword in ingredients_lower:
-                    detected_allergens.append(allergen)
-                    break
+        found = self._match_allergens(ingredients_lower)
+
+        # Report in the same order as COMMON_ALLERGENS
+        detected_allergens = [a for a in self.COMMON_ALLERGENS if a in found]
 
         return {
             'allergens_detected': detected_allergens,
@@ -4,16 +4,164 @@ Uses Gemini 2.0 Flash for nutrition extraction and report generation
 Enhanced with detailed prompts for comprehensive insights
 """
 
-import google.generativeai as genai
+from google.api_core.exceptions import DeadlineExceeded, ResourceExhausted, ServiceUnavailable
+import hashlib
+import logging
 import os
-from PIL import Image
+import random
+import time
+from collections import OrderedDict
+from threading import Lock
+from io import BytesIO
+from PIL import Image, ImageOps
 import json
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional
 from dotenv import load_dotenv
 
+from services.singleton import SingletonMixin
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
 load_dotenv()
 
-class GeminiService:
+# Retries (with exponential backoff) when Gemini is rate-limited (HTTP 429),
+# overloaded (503) or times out
+MAX_RETRIES = int(os.getenv('GEMINI_MAX_RETRIES', 3))
+RETRY_BASE_DELAY = 1.0  # seconds
+TRANSIENT_ERRORS = (ResourceExhausted, ServiceUnavailable, DeadlineExceeded)
+
+# After this many consecutive calls fail even with retries, fail fast for
+# BREAKER_RESET seconds instead of tying up worker threads in backoff
+BREAKER_FAILURES = int(os.getenv('GEMINI_BREAKER_FAILURES', 5))
+BREAKER_RESET = float(os.getenv('GEMINI_BREAKER_RESET', 30))  # seconds
+
+# Token bucket pacing generate_content calls per worker (0 disables); bursts
+# up to the per-minute budget, then callers wait for the bucket to refill
+GEMINI_RPM = float(os.getenv('GEMINI_RPM', 0))
+
+# Identical prompts (and images) within the TTL reuse the earlier response
+GEMINI_CACHE_SIZE = int(os.getenv('GEMINI_CACHE_SIZE', 1024))
+GEMINI_CACHE_TTL = int(os.getenv('GEMINI_CACHE_TTL', 600))  # seconds
+
+# With REDIS_URL set, responses are also kept in Redis so they survive restarts
+# and are shared by all workers
+GEMINI_SHARED_TTL = int(os.getenv('GEMINI_SHARED_TTL', 7 * 86400))  # seconds
+
+# Images within both limits are sent as-is; anything larger is downscaled and
+# re-encoded as JPEG, cutting upload size and vision tokens
+MAX_INLINE_IMAGE_BYTES = 512 * 1024
+MAX_IMAGE_EDGE = 1568  # px, Gemini's vision input cap
+UPLOAD_JPEG_QUALITY = 85
+
+# Magic bytes of image formats Gemini accepts without re-encoding
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+)
+
+log = logging.getLogger(__name__)
+
+def _prompt_json(value) -> str:
+    """Compact JSON for prompts; indentation only costs input tokens"""
+    if orjson is None:
+        return json.dumps(value, separators=(',', ':'))
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode()
+
+# Rows of the locally computed comparison table: label, nutrition_facts keys
+# (first present wins) and how the best product is picked (None = no winner)
+COMPARISON_METRICS = (
+    ('Protein (g)', ('protein',), max),
+    ('Carbs (g)', ('carbohydrates', 'total_carbs', 'carbs'), None),
+    ('Fats (g)', ('total_fat', 'fat'), min),
+    ('Calories', ('calories',), min),
+    ('Fiber (g)', ('dietary_fiber', 'fiber'), max),
+    ('Sugar (g)', ('sugar',), min),
+    ('Sodium (mg)', ('sodium',), min),
+)
+
+def _comparison_table(products: List[Dict]) -> str:
+    """Markdown nutrition table for compare_products_ai, with the winner of each metric"""
+    products = [product if isinstance(product, dict) else {} for product in products]
+    names = [
+        product.get('product_name') or product.get('name') or f'Product {i}'
+        for i, product in enumerate(products, 1)
+    ]
+    facts = [
+        product['nutrition_facts'] if isinstance(product.get('nutrition_facts'), dict) else product
+        for product in products
+    ]
+
+    lines = [
+        '| Metric | ' + ' | '.join(names) + ' | Best Choice |',
+        '|' + '---|' * (len(names) + 2),
+    ]
+    for label, keys, pick in COMPARISON_METRICS:
+        values = []
+        for nutrition in facts:
+            value = next((nutrition[key] for key in keys if nutrition.get(key) is not None), None)
+            numeric = isinstance(value, (int, float)) and not isinstance(value, bool)
+            values.append(value if numeric else None)
+
+        present = [(value, i) for i, value in enumerate(values) if value is not None]
+        if not present:
+            continue
+
+        best = '-'
+        if pick is not None and len(present) > 1:
+            best_value = pick(value for value, _ in present)
+            best = ', '.join(names[i] for value, i in present if value == best_value)
+
+        cells = ' | '.join('-' if value is None else f'{value:g}' for value in values)
+        lines.append(f'| {label} | {cells} | {best} |')
+
+    return '\n'.join(lines)
+
+# Rows of the report's nutrition comparison table: label, nutrition_data keys,
+# unit, Indian RDA, WHO guideline, daily value and whether more is better.
+# Verdicts follow the %DV rule: 5% of the daily value or less is low, 20% or more is high
+REPORT_METRICS = (
+    ('Protein', ('protein',), 'g', '50g (avg)', '0.8g/kg', 50, True),
+    ('Sugar', ('sugar',), 'g', '<25g', '<25g', 25, False),
+    ('Sodium', ('sodium',), 'mg', '<2300mg', '<2000mg', 2000, False),
+    ('Fiber', ('fiber', 'dietary_fiber'), 'g', '25g', '25-30g', 25, True),
+    ('Saturated Fat', ('saturated_fat',), 'g', '<20g', '<10% calories', 20, False),
+)
+
+def _report_comparison_table(nutrition_data: Dict) -> str:
+    """Markdown table of one product against RDA/WHO limits, with precomputed verdicts"""
+    lines = [
+        '| Metric | This Product | Indian RDA | WHO Guideline | % Daily Value | Verdict |',
+        '|--------|-------------|-----------|---------------|---------------|---------|',
+    ]
+    for label, keys, unit, rda, who, daily_value, more_is_better in REPORT_METRICS:
+        value = next((nutrition_data[key] for key in keys if nutrition_data.get(key) is not None), None)
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            lines.append(f'| {label} | Not listed | {rda} | {who} | - | - |')
+            continue
+
+        percent = value / daily_value * 100
+        if percent >= 20:
+            verdict = 'Good' if more_is_better else 'High'
+        elif percent <= 5:
+            verdict = 'Low' if more_is_better else 'Good'
+        else:
+            verdict = 'Average'
+        lines.append(f'| {label} | {value:g}{unit} | {rda} | {who} | {percent:.0f}% | {verdict} |')
+
+    return '\n'.join(lines)
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers catch either
+_parse_json = json.loads if orjson is None else orjson.loads
+
+class GeminiService(SingletonMixin):
     """Service for Google Gemini AI integration"""
 
     def __init__(self):
@@ -23,6 +171,9 @@ class GeminiService:
         if not api_key:
             raise ValueError("GEMINI_API_KEY not found in environment variables")
 
+        # Imported here so workers without a key skip loading the SDK (~0.5 s)
+        import google.generativeai as genai
+
         genai.configure(api_key=api_key)
 
         # Use Gemini 2.0 Flash model
@@ -36,10 +187,183 @@ class GeminiService:
             "max_output_tokens": 4096,  # Increased for detailed reports
         }
 
+        # Label extraction returns a short JSON object; keep it near-deterministic
+        self.extraction_config = {
+            "temperature": 0.1,
+            "top_p": 0.95,
+            "top_k": 40,
+            "max_output_tokens": 1024,
+        }
+
+        # LRU of (expiry time, response text), keyed by a digest of the request contents
+        self.response_cache = OrderedDict()
+        self._cache_lock = Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+        self.shared_cache = None
+        if redis is not None and os.getenv('REDIS_URL'):
+            try:
+                self.shared_cache = redis.Redis.from_url(os.getenv('REDIS_URL'))
+                print("✓ Redis Gemini response cache configured")
+            except Exception as e:
+                print(f"⚠ Redis Gemini response cache not initialized: {e}")
+
+        # Circuit breaker state, shared by all request threads
+        self._breaker_lock = Lock()
+        self._consecutive_failures = 0
+        self._breaker_open_until = 0.0
+
+        # Rate limiter state (see GEMINI_RPM)
+        self._rate_lock = Lock()
+        self._rate_tokens = GEMINI_RPM
+        self._rate_updated = time.monotonic()
+
+    @staticmethod
+    def _contents_key(contents, generation_config: Dict) -> bytes:
+        """Digest of a prompt, or of a list of prompt parts and inline images"""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(repr(sorted(generation_config.items())).encode())
+        parts = contents if isinstance(contents, list) else [contents]
+        for part in parts:
+            if isinstance(part, dict):
+                digest.update(f'image:{part["mime_type"]}:'.encode())
+                digest.update(part['data'])
+            else:
+                digest.update(b'text:')
+                digest.update(str(part).encode())
+            digest.update(b'\0')
+        return digest.digest()
+
+    def _generate(self, contents, generation_config: Optional[Dict] = None) -> str:
+        """Response text for contents, from the caches or a (retried) Gemini call"""
+        if generation_config is None:
+            generation_config = self.generation_config
+
+        key = self._contents_key(contents, generation_config)
+        now = time.monotonic()
+        with self._cache_lock:
+            cached = self.response_cache.get(key)
+            if cached is not None and cached[0] > now:
+                self.response_cache.move_to_end(key)
+                self.cache_hits += 1
+                log.debug("Gemini cache hit (%d hits, %d misses)", self.cache_hits, self.cache_misses)
+                return cached[1]
+            self.cache_misses += 1
+
+        text = self._load_shared(key)
+        if text is None:
+            text = self._call_model(contents, generation_config).text
+            self._save_shared(key, text)
+
+        with self._cache_lock:
+            self.response_cache[key] = (time.monotonic() + GEMINI_CACHE_TTL, text)
+            self.response_cache.move_to_end(key)
+            if len(self.response_cache) > GEMINI_CACHE_SIZE:
+                self.response_cache.popitem(last=False)
+
+        return text
+
+    def _load_shared(self, key: bytes) -> Optional[str]:
+        """Response text from the Redis cache, or None"""
+        if self.shared_cache is None:
+            return None
+        try:
+            cached = self.shared_cache.get(b'gemini:' + key.hex().encode())
+        except redis.RedisError as e:
+            log.warning("Redis Gemini cache unavailable: %s", e)
+            return None
+        return None if cached is None else cached.decode()
+
+    def _save_shared(self, key: bytes, text: str):
+        """Store response text in the Redis cache, if configured"""
+        if self.shared_cache is None:
+            return
+        try:
+            self.shared_cache.set(b'gemini:' + key.hex().encode(), text.encode(), ex=GEMINI_SHARED_TTL)
+        except redis.RedisError as e:
+            log.warning("Redis Gemini cache unavailable: %s", e)
+
+    @staticmethod
+    def _image_part(image_path: str) -> Dict:
+        """Inline image part for Gemini, downscaled only when the file is too large"""
+        with open(image_path, 'rb') as f:
+            data = f.read()
+
+        # Opening only parses the header; pixels are decoded if we resize
+        image = Image.open(BytesIO(data))
+
+        if len(data) <= MAX_INLINE_IMAGE_BYTES and max(image.size) <= MAX_IMAGE_EDGE:
+            for signature, mime_type in IMAGE_SIGNATURES:
+                if data.startswith(signature):
+                    return {'mime_type': mime_type, 'data': data}
+
+        # Oversized or other formats: upright, downscale once and send as JPEG
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((MAX_IMAGE_EDGE, MAX_IMAGE_EDGE), Image.LANCZOS)
+        buffer = BytesIO()
+        image.convert('RGB').save(buffer, format='JPEG', quality=UPLOAD_JPEG_QUALITY, optimize=True)
+        return {'mime_type': 'image/jpeg', 'data': buffer.getvalue()}
+
+    def _wait_for_rate_limit(self):
+        """Block until the token bucket allows another Gemini call"""
+        if GEMINI_RPM <= 0:
+            return
+
+        while True:
+            with self._rate_lock:
+                now = time.monotonic()
+                refill = (now - self._rate_updated) * GEMINI_RPM / 60
+                self._rate_tokens = min(GEMINI_RPM, self._rate_tokens + refill)
+                self._rate_updated = now
+                if self._rate_tokens >= 1:
+                    self._rate_tokens -= 1
+                    return
+                wait = (1 - self._rate_tokens) * 60 / GEMINI_RPM
+            time.sleep(wait)
+
+    def _call_model(self, contents, generation_config: Dict, stream: bool = False):
+        """generate_content with retries on transient errors, behind a circuit breaker"""
+        with self._breaker_lock:
+            if time.monotonic() < self._breaker_open_until:
+                raise RuntimeError("Gemini is temporarily unavailable, try again shortly")
+
+        for attempt in range(MAX_RETRIES + 1):
+            self._wait_for_rate_limit()
+            try:
+                response = self.model.generate_content(
+                    contents,
+                    generation_config=generation_config,
+                    stream=stream
+                )
+                break
+            except TRANSIENT_ERRORS:
+                if attempt == MAX_RETRIES:
+                    with self._breaker_lock:
+                        self._consecutive_failures += 1
+                        if self._consecutive_failures >= BREAKER_FAILURES:
+                            self._breaker_open_until = time.monotonic() + BREAKER_RESET
+                            log.warning("Gemini failing repeatedly; pausing calls for %gs", BREAKER_RESET)
+                    raise
+                time.sleep(RETRY_BASE_DELAY * 2 ** attempt + random.uniform(0, RETRY_BASE_DELAY))
+
+        with self._breaker_lock:
+            self._consecutive_failures = 0
+        return response
+
+    def _generate_stream(self, contents) -> Iterator[str]:
+        """Like _generate, but yield the response text chunk by chunk as it arrives"""
+        # Transient errors are reported when the stream opens, so only that is retried
+        response = self._call_model(contents, self.generation_config, stream=True)
+
+        for chunk in response:
+            if chunk.text:
+                yield chunk.text
+
     def extract_nutrition_from_image(self, image_path: str) -> Dict:
         """Extract nutrition facts from food label image using Gemini Vision"""
         try:
-            image = Image.open(image_path)
+            image = self._image_part(image_path)
             prompt = """Analyze this food label image and extract ALL nutrition information.
 
 Return ONLY a valid JSON object with this exact structure (use null for missing values):
@@ -78,21 +402,15 @@ IMPORTANT:
 - Be accurate with the numbers you see
 - If something is not visible, use null"""
 
-            response = self.model.generate_content(
-                [prompt, image],
-                generation_config=self.generation_config
-            )
-
-            result_text = response.text.strip()
-            if result_text.startswith("```json"):
-                result_text = result_text[7:]
-            if result_text.startswith("```"):
-                result_text = result_text[3:]
-            if result_text.endswith("```"):
-                result_text = result_text[:-3]
-            result_text = result_text.strip()
-
-            nutrition_data = json.loads(result_text)
+            result_text = self._generate([prompt, image], self.extraction_config)
+
+            # Take the outermost {...}, skipping any ``` fences or prose around it
+            start = result_text.find('{')
+            end = result_text.rfind('}')
+            if start == -1 or end < start:
+                raise json.JSONDecodeError('No JSON object in response', result_text, 0)
+
+            nutrition_data = _parse_json(result_text[start:end + 1])
             return {
                 'success': True,
                 'data': nutrition_data,
@@ -104,7 +422,7 @@ IMPORTANT:
             return {
                 'success': False,
                 'error': f'Failed to parse JSON: {str(e)}',
-                'raw_response': response.text if 'response' in locals() else None
+                'raw_response': result_text
             }
         except Exception as e:
             return {
@@ -120,13 +438,47 @@ IMPORTANT:
     ) -> Dict:
         """Generate a comprehensive nutrition report using Gemini"""
         try:
-            # Extract metadata fields
-            serving_size = nutrition_data.get('serving_size', 'Not specified')
-            net_weight = nutrition_data.get('net_weight', 'Not specified')
-            servings_per_container = nutrition_data.get('servings_per_container', 'Not specified')
-            ingredients = nutrition_data.get('ingredients', [])
+            prompt = self._report_prompt(nutrition_data, fssai_verification, user_profile)
+
+            response_text = self._generate(prompt)
 
-            prompt = f"""You are an expert nutritionist, FSSAI compliance specialist, and fitness coach. Generate a detailed, professional nutrition analysis report.
+            return {
+                'success': True,
+                'report': response_text,
+                'generated_by': 'gemini-2.0-flash'
+            }
+
+        except Exception as e:
+            return {
+                'success': False,
+                'error': f'Error generating report: {str(e)}'
+            }
+
+    def generate_comprehensive_report_stream(
+        self,
+        nutrition_data: Dict,
+        fssai_verification: Dict,
+        user_profile: Optional[Dict] = None
+    ) -> Iterator[str]:
+        """Stream the generate_comprehensive_report text as Gemini produces it"""
+        return self._generate_stream(
+            self._report_prompt(nutrition_data, fssai_verification, user_profile)
+        )
+
+    def _report_prompt(
+        self,
+        nutrition_data: Dict,
+        fssai_verification: Dict,
+        user_profile: Optional[Dict] = None
+    ) -> str:
+        """Build the prompt for generate_comprehensive_report"""
+        # Extract metadata fields
+        serving_size = nutrition_data.get('serving_size', 'Not specified')
+        net_weight = nutrition_data.get('net_weight', 'Not specified')
+        servings_per_container = nutrition_data.get('servings_per_container', 'Not specified')
+        ingredients = nutrition_data.get('ingredients', [])
+
+        prompt = f"""You are an expert nutritionist, FSSAI compliance specialist, and fitness coach. Generate a detailed, professional nutrition analysis report.
 
 PRODUCT INFORMATION:
 - Serving Size: {serving_size}
@@ -135,10 +487,10 @@ PRODUCT INFORMATION:
 - Ingredients: {', '.join(ingredients) if ingredients else 'Not provided'}
 
 NUTRITION DATA (per serving):
-{json.dumps(nutrition_data, indent=2)}
+{_prompt_json(nutrition_data)}
 
 FSSAI VERIFICATION STATUS:
-{json.dumps(fssai_verification, indent=2)}
+{_prompt_json(fssai_verification)}
 
 IMPORTANT: Use the serving size, net weight, and servings per container information to provide accurate calculations:
 - Calculate total product nutrition (serving data × servings per container)
@@ -146,8 +498,8 @@ IMPORTANT: Use the serving size, net weight, and servings per container informat
 - Provide context on portion sizes
 - Compare serving size to typical portion sizes
 """
-            if user_profile:
-                prompt += f"""
+        if user_profile:
+            prompt += f"""
 USER PROFILE:
 - Fitness Goal: {user_profile.get('fitness_goal', 'Not specified')}
 - Weight: {user_profile.get('weight', 'Not specified')} kg
@@ -155,7 +507,7 @@ USER PROFILE:
 - Age: {user_profile.get('age', 'Not specified')}
 """
 
-            prompt += f"""
+        prompt += f"""
 Generate a comprehensive, well-structured report with rich insights and actionable advice:
 
 ## 📊 PRODUCT OVERVIEW
@@ -264,13 +616,10 @@ List beneficial aspects:
 
 ## 📊 NUTRITIONAL COMPARISON
 
-| Metric | This Product | Indian RDA | WHO Guideline | Verdict |
-|--------|-------------|-----------|---------------|---------|
-| Protein | {nutrition_data.get('protein', 0)}g | 50g (avg) | 0.8g/kg | [Good/Average/Low] |
-| Sugar | {nutrition_data.get('sugar', 0)}g | <25g | <25g | [Good/Average/High] |
-| Sodium | {nutrition_data.get('sodium', 0)}mg | <2300mg | <2000mg | [Good/Average/High] |
-| Fiber | {nutrition_data.get('fiber', 0)}g | 25g | 25-30g | [Good/Average/Low] |
-| Saturated Fat | {nutrition_data.get('saturated_fat', 0)}g | <20g | <10% calories | [Good/Average/High] |
+{_report_comparison_table(nutrition_data)}
+
+(These per-serving verdicts were computed from the label data. Reproduce the table
+exactly as given and keep the analysis above consistent with it.)
 
 ## 🏆 OVERALL ASSESSMENT
 
@@ -297,22 +646,7 @@ If this product scores below 75, suggest 2-3 specific alternative products or in
 
 BE SPECIFIC WITH NUMBERS. USE REAL THRESHOLDS. GIVE ACTIONABLE ADVICE. COMPARE TO STANDARDS. BE HONEST ABOUT PROS AND CONS."""
 
-            response = self.model.generate_content(
-                prompt,
-                generation_config=self.generation_config
-            )
-
-            return {
-                'success': True,
-                'report': response.text,
-                'generated_by': 'gemini-2.0-flash'
-            }
-
-        except Exception as e:
-            return {
-                'success': False,
-                'error': f'Error generating report: {str(e)}'
-            }
+        return prompt
 
     def analyze_ingredients_safety(self, ingredients: List[str]) -> Dict:
         """Analyze ingredient safety with detailed breakdown"""
@@ -320,7 +654,7 @@ BE SPECIFIC WITH NUMBERS. USE REAL THRESHOLDS. GIVE ACTIONABLE ADVICE. COMPARE T
             prompt = f"""As a food safety expert, analyze these ingredients comprehensively:
 
 INGREDIENTS LIST:
-{json.dumps(ingredients, indent=2)}
+{_prompt_json(ingredients)}
 
 Provide a detailed safety analysis:
 
@@ -404,14 +738,11 @@ If score < 70, suggest what ingredients to look for instead.
 
 BE SPECIFIC. CITE ACTUAL RESEARCH OR REGULATIONS WHEN RELEVANT. BE BALANCED BUT HONEST."""
 
-            response = self.model.generate_content(
-                prompt,
-                generation_config=self.generation_config
-            )
+            response_text = self._generate(prompt)
 
             return {
                 'success': True,
-                'analysis': response.text,
+                'analysis': response_text,
                 'generated_by': 'gemini-2.0-flash'
             }
 
@@ -432,7 +763,7 @@ BE SPECIFIC. CITE ACTUAL RESEARCH OR REGULATIONS WHEN RELEVANT. BE BALANCED BUT
             prompt = f"""As a certified nutritionist and fitness coach, provide a detailed personalized recommendation.
 
 PRODUCT NUTRITION:
-{json.dumps(nutrition_data, indent=2)}
+{_prompt_json(nutrition_data)}
 
 USER PROFILE:
 - Fitness Goal: {user_profile.get('fitness_goal', 'maintenance')}
@@ -534,14 +865,11 @@ For your {user_profile.get('fitness_goal')} goal:
 
 BE HONEST. BE SPECIFIC TO THIS USER. USE THEIR ACTUAL DATA. GIVE NUMBERS. BE PRACTICAL."""
 
-            response = self.model.generate_content(
-                prompt,
-                generation_config=self.generation_config
-            )
+            response_text = self._generate(prompt)
 
             return {
                 'success': True,
-                'recommendation': response.text,
+                'recommendation': response_text,
                 'generated_by': 'gemini-2.0-flash'
             }
 
@@ -557,22 +885,16 @@ BE HONEST. BE SPECIFIC TO THIS USER. USE THEIR ACTUAL DATA. GIVE NUMBERS. BE PRA
             prompt = f"""As a nutrition expert, provide a comprehensive product comparison:
 
 PRODUCTS TO COMPARE:
-{json.dumps(products, indent=2)}
+{_prompt_json(products)}
 
 ## 📊 HEAD-TO-HEAD COMPARISON
 
 ### Nutrition Comparison Table:
 
-| Metric | Product 1 | Product 2 | Product 3 | Best Choice |
-|--------|-----------|-----------|-----------|-------------|
-| Protein (g) | X | Y | Z | [Winner] |
-| Carbs (g) | X | Y | Z | [Winner] |
-| Fats (g) | X | Y | Z | [Winner] |
-| Calories | X | Y | Z | [Winner] |
-| Fiber (g) | X | Y | Z | [Winner] |
-| Sugar (g) | X | Y | Z | [Winner] |
-| Sodium (mg) | X | Y | Z | [Winner] |
-| Price/Serving | X | Y | Z | [Winner] |
+{_comparison_table(products)}
+
+(This table was computed from the label data. Reproduce it exactly as given and
+do not recalculate it; base the sections below on these numbers.)
 
 ## 🏆 WINNERS BY CATEGORY
 
@@ -633,14 +955,11 @@ PRODUCTS TO COMPARE:
 
 BE SPECIFIC. USE ACTUAL NUMBERS. BE PRACTICAL. GIVE CLEAR WINNER."""
 
-            response = self.model.generate_content(
-                prompt,
-                generation_config=self.generation_config
-            )
+            response_text = self._generate(prompt)
 
             return {
                 'success': True,
-                'comparison': response.text,
+                'comparison': response_text,
                 'generated_by': 'gemini-2.0-flash'
             }
 
@@ -653,17 +972,39 @@ BE SPECIFIC. USE ACTUAL NUMBERS. BE PRACTICAL. GIVE CLEAR WINNER."""
     def answer_nutrition_question(self, question: str, context: Dict = None) -> Dict:
         """Answer nutrition questions with detailed explanations"""
         try:
-            prompt = f"""As a nutrition expert and FSSAI specialist, provide a comprehensive answer:
+            prompt = self._question_prompt(question, context)
+
+            response_text = self._generate(prompt)
+
+            return {
+                'success': True,
+                'answer': response_text,
+                'generated_by': 'gemini-2.0-flash'
+            }
+
+        except Exception as e:
+            return {
+                'success': False,
+                'error': f'Error answering question: {str(e)}'
+            }
+
+    def answer_nutrition_question_stream(self, question: str, context: Dict = None) -> Iterator[str]:
+        """Stream the answer_nutrition_question text as Gemini produces it"""
+        return self._generate_stream(self._question_prompt(question, context))
+
+    def _question_prompt(self, question: str, context: Dict = None) -> str:
+        """Build the prompt for answer_nutrition_question"""
+        prompt = f"""As a nutrition expert and FSSAI specialist, provide a comprehensive answer:
 
 QUESTION: {question}
 """
-            if context:
-                prompt += f"""
+        if context:
+            prompt += f"""
 CONTEXT:
-{json.dumps(context, indent=2)}
+{_prompt_json(context)}
 """
 
-            prompt += """
+        prompt += """
 Provide a detailed, well-structured answer with:
 
 ## 📚 DIRECT ANSWER
@@ -686,22 +1027,7 @@ Provide a detailed, well-structured answer with:
 
 BE ACCURATE. CITE STANDARDS. BE PRACTICAL. USE INDIAN CONTEXT."""
 
-            response = self.model.generate_content(
-                prompt,
-                generation_config=self.generation_config
-            )
-
-            return {
-                'success': True,
-                'answer': response.text,
-                'generated_by': 'gemini-2.0-flash'
-            }
-
-        except Exception as e:
-            return {
-                'success': False,
-                'error': f'Error answering question: {str(e)}'
-            }
+        return prompt
 
     def generate_meal_suggestions(
         self,
@@ -714,7 +1040,7 @@ BE ACCURATE. CITE STANDARDS. BE PRACTICAL. USE INDIAN CONTEXT."""
             prompt = f"""As a nutrition coach, create practical meal suggestions:
 
 AVAILABLE PRODUCTS:
-{json.dumps(scanned_products, indent=2)}
+{_prompt_json(scanned_products)}
 
 USER PROFILE:
 - Goal: {user_profile.get('fitness_goal', 'maintenance')}
@@ -727,14 +1053,11 @@ Create 3 practical meal ideas using these products, considering Indian eating ha
 
 BE PRACTICAL AND DELICIOUS. CONSIDER INDIAN TASTES."""
 
-            response = self.model.generate_content(
-                prompt,
-                generation_config=self.generation_config
-            )
+            response_text = self._generate(prompt)
 
             return {
                 'success': True,
-                'suggestions': response.text,
+                'suggestions': response_text,
                 'generated_by': 'gemini-2.0-flash'
             }
 
@@ -752,11 +1075,45 @@ BE PRACTICAL AND DELICIOUS. CONSIDER INDIAN TASTES."""
     ) -> Dict:
         """Generate healthier alternative product suggestions"""
         try:
-            product_name = nutrition_data.get('product_name', 'this product')
-            brand = nutrition_data.get('brand', 'Unknown')
-            category = nutrition_data.get('category', 'food product')
+            prompt = self._alternatives_prompt(nutrition_data, fssai_verification, user_profile)
 
-            prompt = f"""As a nutrition expert and food industry specialist, suggest healthier alternative products.
+            response_text = self._generate(prompt)
+
+            return {
+                'success': True,
+                'alternatives': response_text,
+                'generated_by': 'gemini-2.0-flash'
+            }
+
+        except Exception as e:
+            return {
+                'success': False,
+                'error': f'Error generating alternatives: {str(e)}'
+            }
+
+    def generate_healthier_alternatives_stream(
+        self,
+        nutrition_data: Dict,
+        fssai_verification: Dict,
+        user_profile: Optional[Dict] = None
+    ) -> Iterator[str]:
+        """Stream the generate_healthier_alternatives text as Gemini produces it"""
+        return self._generate_stream(
+            self._alternatives_prompt(nutrition_data, fssai_verification, user_profile)
+        )
+
+    def _alternatives_prompt(
+        self,
+        nutrition_data: Dict,
+        fssai_verification: Dict,
+        user_profile: Optional[Dict] = None
+    ) -> str:
+        """Build the prompt for generate_healthier_alternatives"""
+        product_name = nutrition_data.get('product_name', 'this product')
+        brand = nutrition_data.get('brand', 'Unknown')
+        category = nutrition_data.get('category', 'food product')
+
+        prompt = f"""As a nutrition expert and food industry specialist, suggest healthier alternative products.
 
 CURRENT PRODUCT:
 - Name: {product_name}
@@ -764,24 +1121,24 @@ CURRENT PRODUCT:
 - Category: {category}
 
 NUTRITION DATA (per serving):
-{json.dumps(nutrition_data.get('nutrition_facts', {}), indent=2)}
+{_prompt_json(nutrition_data.get('nutrition_facts', {}))}
 
 FSSAI COMPLIANCE:
-{json.dumps(fssai_verification, indent=2)}
+{_prompt_json(fssai_verification)}
 
 INGREDIENTS:
 {', '.join(nutrition_data.get('ingredients', []))}
 """
 
-            if user_profile:
-                prompt += f"""
+        if user_profile:
+            prompt += f"""
 USER PROFILE:
 - Fitness Goal: {user_profile.get('fitness_goal', 'general health')}
 - Dietary Preferences: {user_profile.get('dietary_preference', 'none specified')}
 - Age: {user_profile.get('age', 'not specified')}
 """
 
-            prompt += """
+        prompt += """
 Generate a comprehensive alternatives recommendation with:
 
 ## 🎯 WHY LOOK FOR ALTERNATIVES?
@@ -927,19 +1284,4 @@ IMPORTANT INSTRUCTIONS:
 - Prioritize based on user's goals
 - Make recommendations actionable and practical"""
 
-            response = self.model.generate_content(
-                prompt,
-                generation_config=self.generation_config
-            )
-
-            return {
-                'success': True,
-                'alternatives': response.text,
-                'generated_by': 'gemini-2.0-flash'
-            }
-
-        except Exception as e:
-            return {
-                'success': False,
-                'error': f'Error generating alternatives: {str(e)}'
-            }
+        return prompt
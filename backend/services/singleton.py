@@ -0,0 +1,20 @@
+"""
+Shared-instance support for services
+"""
+
+from threading import Lock
+
+class SingletonMixin:
+    """Adds get_instance(), returning one lazily created instance per class"""
+
+    _instance = None
+    _instance_lock = Lock()
+
+    @classmethod
+    def get_instance(cls):
+        """Return the process-wide instance, creating it on first use"""
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
@@ -0,0 +1,54 @@
+"""
+Conditional GET helpers (ETag / If-None-Match) for read-only endpoints
+"""
+
+from flask import current_app, request
+import hashlib
+import os
+import uuid
+
+from utils.json_response import json_response
+
+# In-memory data is per process, so ETags are scoped to the process that issued them.
+# Derived on first use per pid: with preload_app the module is imported in the
+# gunicorn master, and every forked worker would otherwise inherit its tag
+_process_tag = (None, None)  # (pid, tag)
+
+def _get_process_tag() -> str:
+    """ETag prefix unique to the current process (recomputed after a fork)"""
+    global _process_tag
+    pid, tag = _process_tag
+    if pid != os.getpid():
+        pid = os.getpid()
+        tag = f"{pid}.{uuid.uuid4().hex[:8]}"
+        _process_tag = (pid, tag)
+    return tag
+
+def conditional_json(key: str, build_body, status: int = 200):
+    """
+    Serve a JSON body with a weak ETag, or 304 if the client's copy is current
+
+    Args:
+        key: Identifies the resource version (must change whenever the body does)
+        build_body: Callable returning the JSON-serializable body (or already
+                    encoded JSON bytes), only called on a miss
+        status: Status code for a full response
+
+    Returns:
+        Flask response
+    """
+    # Hash the key so arbitrary product IDs are safe inside the quoted ETag
+    digest = hashlib.blake2b(key.encode('utf-8'), digest_size=8).hexdigest()
+    etag = f"{_get_process_tag()}-{digest}"
+
+    if request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+    else:
+        body = build_body()
+        if isinstance(body, bytes):
+            response = current_app.response_class(body, status=status, mimetype='application/json')
+        else:
+            response = json_response(body, status)
+
+    response.set_etag(etag, weak=True)
+    return response
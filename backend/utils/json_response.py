@@ -0,0 +1,106 @@
+"""
+Fast JSON responses - orjson when installed, flask.jsonify otherwise
+"""
+
+from flask import current_app, jsonify, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+import json
+
+try:
+    import orjson
+    # Sorted keys match Flask's default jsonify output
+    _ORJSON_OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+except ImportError:
+    orjson = None
+
+def json_response(payload, status: int = 200):
+    """
+    Serialize payload into a JSON response
+
+    Args:
+        payload: JSON-serializable object
+        status: HTTP status code
+
+    Returns:
+        Flask response
+    """
+    if orjson is None:
+        response = jsonify(payload)
+        response.status_code = status
+        return response
+
+    return current_app.response_class(
+        orjson.dumps(payload, option=_ORJSON_OPTIONS),
+        status=status,
+        mimetype='application/json'
+    )
+
+def ndjson_response(items):
+    """
+    Stream an iterable of JSON-serializable objects as newline-delimited JSON
+
+    Args:
+        items: Iterable (usually a generator) of payloads, one per line
+
+    Returns:
+        Streaming Flask response (application/x-ndjson)
+    """
+    lines = (encode_json(item) + b'\n' for item in items)
+    return current_app.response_class(
+        stream_with_context(lines),
+        mimetype='application/x-ndjson'
+    )
+
+def encode_json(payload) -> bytes:
+    """Serialize payload to JSON bytes (for caches and stores rather than responses)"""
+    if orjson is None:
+        return json.dumps(payload).encode('utf-8')
+    return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+def decode_json(data):
+    """Parse JSON bytes or str produced by encode_json"""
+    if orjson is None:
+        return json.loads(data)
+    return orjson.loads(data)
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by orjson, so jsonify and request.get_json
+    use it everywhere. Output matches DefaultJSONProvider: sorted keys,
+    indented in debug mode, dates in HTTP format.
+    """
+
+    def dumps(self, obj, **kwargs) -> str:
+        # Callers passing stdlib json options (e.g. separators) keep the default encoder
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._options()).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        option = self._options() | orjson.OPT_APPEND_NEWLINE
+
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            option |= orjson.OPT_INDENT_2
+
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=option),
+            mimetype=self.mimetype
+        )
+
+    def _options(self) -> int:
+        # Let self.default format datetimes the way Flask does
+        option = _ORJSON_OPTIONS | orjson.OPT_PASSTHROUGH_DATETIME
+        if not self.sort_keys:
+            option &= ~orjson.OPT_SORT_KEYS
+        return option
+
+def init_json(app):
+    """Install OrjsonProvider on app when orjson is available"""
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
@@ -0,0 +1,105 @@
+"""
+Numeric scoring kernels for fitness analysis
+
+Compiled with numba when it is installed; otherwise the same functions
+run as plain Python so the API behaves identically either way.
+"""
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """Fallback no-op decorator when numba is not installed"""
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+# Goal codes accepted by fitness_score
+GOAL_OTHER = 0
+GOAL_MUSCLE_BUILDING = 1
+GOAL_WEIGHT_LOSS = 2
+
+GOAL_CODES = {
+    'muscle_building': GOAL_MUSCLE_BUILDING,
+    'weight_loss': GOAL_WEIGHT_LOSS,
+}
+
+# Strength bits, in the order the messages are reported
+STRENGTH_HIGH_PROTEIN = 1 << 0
+STRENGTH_GOOD_CARBS = 1 << 1
+STRENGTH_PROTEIN_LOW_CAL = 1 << 2
+STRENGTH_LOW_SUGAR = 1 << 3
+STRENGTH_LOW_FAT = 1 << 4
+
+# Weakness bits, in the order the messages are reported
+WEAKNESS_HIGH_SUGAR_MUSCLE = 1 << 0
+WEAKNESS_LOW_PROTEIN = 1 << 1
+WEAKNESS_HIGH_SUGAR_WEIGHT = 1 << 2
+WEAKNESS_HIGH_CALORIE = 1 << 3
+
+# Best use case codes
+USE_POST_WORKOUT = 0
+USE_PROTEIN_SNACK = 1
+USE_PRE_WORKOUT = 2
+USE_PROTEIN_SUPPLEMENT = 3
+USE_GENERAL_SNACK = 4
+
+
+@njit(cache=True)
+def fitness_score(protein, carbs, fat, sugar, calories, goal_code):
+    """Return (unclamped score, strengths mask, weaknesses mask, use case code)"""
+    score = 0.0
+    strengths = 0
+    weaknesses = 0
+
+    if goal_code == GOAL_MUSCLE_BUILDING:
+        if protein >= 20:
+            strengths |= STRENGTH_HIGH_PROTEIN
+            score += 40
+        if protein >= 10:
+            score += 20
+        if carbs >= 25:
+            strengths |= STRENGTH_GOOD_CARBS
+            score += 20
+        if sugar > 20:
+            weaknesses |= WEAKNESS_HIGH_SUGAR_MUSCLE
+            score -= 10
+        if protein < 15:
+            weaknesses |= WEAKNESS_LOW_PROTEIN
+
+    elif goal_code == GOAL_WEIGHT_LOSS:
+        if protein >= 15 and calories < 200:
+            strengths |= STRENGTH_PROTEIN_LOW_CAL
+            score += 40
+        if sugar < 5:
+            strengths |= STRENGTH_LOW_SUGAR
+            score += 20
+        if fat < 5:
+            strengths |= STRENGTH_LOW_FAT
+            score += 20
+        if sugar > 15:
+            weaknesses |= WEAKNESS_HIGH_SUGAR_WEIGHT
+            score -= 20
+        if calories > 300:
+            weaknesses |= WEAKNESS_HIGH_CALORIE
+            score -= 10
+
+    if protein >= 20 and carbs >= 30:
+        use_case = USE_POST_WORKOUT
+    elif protein >= 20 and sugar < 10:
+        use_case = USE_PROTEIN_SNACK
+    elif carbs >= 30 and fat < 5:
+        use_case = USE_PRE_WORKOUT
+    elif protein >= 15:
+        use_case = USE_PROTEIN_SUPPLEMENT
+    else:
+        use_case = USE_GENERAL_SNACK
+
+    return score, strengths, weaknesses, use_case
+
+
+# Compile once at import so the first request doesn't pay for it
+fitness_score(0.0, 0.0, 0.0, 0.0, 0.0, GOAL_OTHER)
@@ -0,0 +1,18 @@
+"""
+Timestamp helpers shared by the API blueprints
+"""
+
+from flask import g, has_request_context
+from datetime import datetime
+
+def now_iso() -> str:
+    """Current time as an ISO string, computed once per request"""
+    if not has_request_context():
+        return datetime.now().isoformat()
+
+    timestamp = getattr(g, '_now_iso', None)
+    if timestamp is None:
+        timestamp = datetime.now().isoformat()
+        g._now_iso = timestamp
+
+    return timestamp
@@ -0,0 +1,20 @@
+"""
+Request class that keeps multipart file uploads in memory
+"""
+
+from flask import Request
+from io import BytesIO
+
+class InMemoryUploadRequest(Request):
+    """
+    Buffer uploaded files in memory instead of spooling them to disk
+
+    Werkzeug's default stream factory rolls anything over 500KB into a
+    temporary file, so a typical label photo is written to disk while the
+    form is parsed and read straight back by the scan handler. Request
+    size is already capped by MAX_CONTENT_LENGTH, which bounds the buffer.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type,
+                         filename=None, content_length=None):
+        return BytesIO()
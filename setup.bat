@@ -56,9 +56,6 @@ if not exist .env (
     echo Please edit backend\.env with your configuration
 )
 
-REM Create uploads directory
-if not exist uploads mkdir uploads
-
 echo Backend setup complete!
 
 cd ..
@@ -46,9 +46,6 @@ if [ ! -f .env ]; then
     echo "Please edit backend/.env with your configuration"
 fi
 
-# Create uploads directory
-mkdir -p uploads
-
 echo "Backend setup complete!"
 
 cd ..
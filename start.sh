@@ -5,4 +5,5 @@ set -o errexit  # Exit on error
 
 echo "Starting PackCheck API..."
 cd backend
-exec gunicorn --bind 0.0.0.0:$PORT --workers 2 --threads 2 --timeout 120 app:app
+# Worker, thread and bind settings live in gunicorn.conf.py
+exec gunicorn -c gunicorn.conf.py app:app
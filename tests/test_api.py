@@ -0,0 +1,175 @@
+"""
+API tests using the Flask test client
+"""
+
+import pytest
+import io
+import sys
+import threading
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent / 'backend'))
+
+from app import create_app
+from api import community
+from api.scan import MAX_BATCH_IMAGES
+from models.schemas import MAX_BATCH_SIZE
+
+class TestAPI:
+    """Test request validation, conditional GETs and concurrent writes"""
+
+    def setup_method(self):
+        """Setup test fixtures"""
+        self.app = create_app()
+        self.client = self.app.test_client()
+
+    def _store(self, product_id, protein):
+        return self.client.post('/api/nutrition/store', json={
+            'product_id': product_id,
+            'nutrition_facts': {'protein': protein, 'sugar': 2},
+            'metadata': {'name': 'Oats', 'brand': 'Test'}
+        })
+
+    def _run_threads(self, target, count=8):
+        """Run target(worker) on several threads, switching between them as often as possible"""
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            threads = [threading.Thread(target=target, args=(worker,)) for worker in range(count)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            sys.setswitchinterval(interval)
+
+    def _submit(self, product_id, user_id='tester'):
+        response = self.client.post('/api/community/verify', json={
+            'product_id': product_id,
+            'user_id': user_id,
+            'verification_type': 'correct',
+            'data': {'protein': 12}
+        })
+        assert response.status_code == 201
+        return response.get_json()['verification']['verification_id']
+
+    def test_nutrition_etag_304_until_store(self):
+        """Test If-None-Match gets a 304, and a new ETag once the product is stored again"""
+        assert self._store('etag-product', 10).status_code == 201
+        first = self.client.get('/api/nutrition/etag-product')
+        etag = first.headers['ETag']
+
+        cached = self.client.get('/api/nutrition/etag-product', headers={'If-None-Match': etag})
+        assert cached.status_code == 304
+
+        self._store('etag-product', 11)
+        updated = self.client.get('/api/nutrition/etag-product', headers={'If-None-Match': etag})
+        assert updated.status_code == 200
+        assert updated.headers['ETag'] != etag
+        assert updated.get_json()['data']['nutrition_facts']['protein'] == 11
+
+    def test_corrections_etag_changes_on_approve(self):
+        """Test approving a correction invalidates cached correction and product views"""
+        verification_id = self._submit('etag-community')
+        pending = self.client.get('/api/community/corrections?status=pending')
+        product = self.client.get('/api/community/verify/etag-community')
+        assert self.client.get('/api/community/corrections?status=pending',
+                               headers={'If-None-Match': pending.headers['ETag']}).status_code == 304
+
+        response = self.client.post(f'/api/community/corrections/{verification_id}/approve',
+                                    json={'dietitian_id': 'd1'})
+        assert response.status_code == 200
+
+        for url, etag in [('/api/community/corrections?status=pending', pending.headers['ETag']),
+                          ('/api/community/verify/etag-community', product.headers['ETag'])]:
+            refreshed = self.client.get(url, headers={'If-None-Match': etag})
+            assert refreshed.status_code == 200
+            assert refreshed.headers['ETag'] != etag
+
+    def test_non_object_bodies_rejected(self):
+        """Test JSON arrays get a 400 instead of a 500"""
+        for url in ['/api/nutrition/store', '/api/community/verify',
+                    '/api/community/corrections/cv_0/approve',
+                    '/api/community/corrections/cv_0/reject', '/api/verify/fssai/batch']:
+            assert self.client.post(url, json=[1, 2]).status_code == 400, url
+
+    def test_fssai_batch_size_limit(self):
+        """Test the FSSAI batch endpoint accepts up to MAX_BATCH_SIZE products"""
+        product = {'nutrition_facts': {'protein': 10, 'sugar': 2}}
+
+        ok = self.client.post('/api/verify/fssai/batch', json={'products': [product]})
+        too_many = self.client.post('/api/verify/fssai/batch',
+                                    json={'products': [product] * (MAX_BATCH_SIZE + 1)})
+
+        assert ok.status_code == 200
+        assert ok.get_json()['count'] == 1
+        assert too_many.status_code == 400
+
+    def test_scan_batch_image_limit(self):
+        """Test the scan batch endpoint rejects more than MAX_BATCH_IMAGES images before OCR"""
+        images = [(io.BytesIO(b'x'), f'label{index}.png') for index in range(MAX_BATCH_IMAGES + 1)]
+
+        response = self.client.post('/api/scan/batch', data={'images': images},
+                                    content_type='multipart/form-data')
+
+        assert response.status_code == 400
+        assert self.client.post('/api/scan/batch', data={}).status_code == 400
+
+    def test_json_length_limit(self):
+        """Test non-upload routes reject bodies over MAX_JSON_LENGTH with a JSON 413"""
+        self.app.config['MAX_JSON_LENGTH'] = 64
+
+        response = self.client.post('/api/nutrition/store', json={
+            'product_id': 'large-product',
+            'nutrition_facts': {'protein': 10},
+            'metadata': {'name': 'x' * 100}
+        })
+
+        assert response.status_code == 413
+        assert response.get_json() == {'error': 'Request body too large'}
+
+    def test_concurrent_stores(self):
+        """Test stores from several threads all land in the index"""
+        statuses = []
+
+        def store(worker):
+            client = self.app.test_client()
+            for index in range(50):
+                response = client.post('/api/nutrition/store', json={
+                    'product_id': f'concurrent-{worker}-{index}',
+                    'nutrition_facts': {'protein': 500}
+                })
+                statuses.append(response.status_code)
+
+        self._run_threads(store)
+
+        results = self.client.get('/api/nutrition/search?min_protein=500').get_json()['results']
+        assert set(statuses) == {201}
+        assert len([r for r in results if r['product_id'].startswith('concurrent-')]) == 400
+
+    def test_concurrent_reviews(self):
+        """Test concurrent approve/reject of the same corrections keep counts consistent"""
+        verification_ids = [self._submit('race-product', 'race-user') for _ in range(30)]
+        statuses = []
+
+        def review(worker):
+            client = self.app.test_client()
+            for verification_id in verification_ids:
+                if worker % 2:
+                    response = client.post(f'/api/community/corrections/{verification_id}/approve',
+                                           json={'dietitian_id': 'd1'})
+                else:
+                    response = client.post(f'/api/community/corrections/{verification_id}/reject',
+                                           json={'dietitian_id': 'd1', 'reason': 'wrong'})
+                statuses.append(response.status_code)
+
+        self._run_threads(review)
+
+        counts = community.user_contributions['race-user']
+        assert set(statuses) == {200}
+        assert counts['pending'] == 0
+        assert counts['approved'] + counts['rejected'] == counts['total'] == 30
+
+if __name__ == '__main__':
+    pytest.main([__file__])
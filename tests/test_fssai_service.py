@@ -75,6 +75,52 @@ class TestFSSAIService:
         assert 'overall_compliance' in result
         assert 'verifications' in result
 
+    def test_verify_all_claims_batch(self):
+        """Test batch verification matches per-product verification"""
+        nutrition_data_list = [
+            {'protein': 15.0, 'sugar': 4.0, 'fat': 2.0},
+            {'protein': 3.0, 'sugar': 20.0, 'trans_fat': 3.0}
+        ]
+        claims_list = [['high protein', 'low sugar'], ['high protein']]
+
+        results = self.fssai_service.verify_all_claims_batch(nutrition_data_list, claims_list)
+
+        assert len(results) == 2
+        assert results[0] == self.fssai_service.verify_all_claims(nutrition_data_list[0], claims_list[0])
+        assert results[1] == self.fssai_service.verify_all_claims(nutrition_data_list[1], claims_list[1])
+        assert results[1]['overall_compliance'] is False
+
+    def test_verify_compliance_arrays(self):
+        """Test vectorized compliance matches per-product verification"""
+        nutrition_data_list = [
+            {'protein': 15.0, 'sugar': 4.0, 'fat': 2.0},
+            {'protein': 3.0, 'sugar': 20.0, 'trans_fat': 3.0},
+            {'sodium': 200}
+        ]
+        claims_list = [['high protein', 'low sugar'], ['high protein'], ['low sodium']]
+
+        result = self.fssai_service.verify_compliance_arrays(nutrition_data_list, claims_list)
+
+        for i, (nutrition_data, claims) in enumerate(zip(nutrition_data_list, claims_list)):
+            expected = self.fssai_service.verify_all_claims(nutrition_data, claims)
+            assert result['overall_compliance'][i] == expected['overall_compliance']
+            assert result['trust_score'][i] == expected['trust_score']
+        assert result['sodium'].tolist() == [True, True, False]
+        assert result['who_warning'].tolist() == [False, True, False]
+        assert result['who_sodium_pct'][2] == 4.0
+
+    def test_verify_all_claims_cached(self):
+        """Test repeated verification of the same input is served from the cache"""
+        nutrition_data = {'protein': 12.0, 'sugar': 8.0}
+        claims = ['high protein', 'low sugar']
+
+        first = self.fssai_service.verify_all_claims(nutrition_data, claims)
+        second = self.fssai_service.verify_all_claims(dict(nutrition_data), list(claims))
+
+        assert second is first
+        assert len(self.fssai_service.verification_cache) == 1
+        assert first == self.fssai_service._verify_all_claims(nutrition_data, claims)
+
     def test_verify_sugar_content_low_sugar(self):
         """Test low sugar claim verification"""
         result = self.fssai_service._verify_sugar_content(4.0, ['low sugar'])
@@ -140,6 +186,17 @@ class TestFSSAIService:
         assert result['valid'] is False
         assert result['days_remaining'] < 0
 
+    def test_verify_expiry_date_formats(self):
+        """Test the supported expiry date formats and invalid dates"""
+        parse = self.fssai_service.verify_expiry_date
+
+        assert parse('05-06-2030')['expiry_date'] == '2030-06-05T00:00:00'
+        assert parse('06/2030')['expiry_date'] == '2030-06-01T00:00:00'
+        assert parse('Jun 2030')['expiry_date'] == '2030-06-01T00:00:00'
+        assert parse('JUNE 2030')['expiry_date'] == '2030-06-01T00:00:00'
+        assert parse('31/02/2030')['expiry_date'] is None
+        assert parse('05/06-2030')['message'] == "Could not parse expiry date"
+
     def test_detect_allergens(self):
         """Test allergen detection"""
         ingredients = [
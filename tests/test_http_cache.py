@@ -0,0 +1,66 @@
+"""
+Unit tests for conditional GET helpers
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent / 'backend'))
+
+from flask import Flask
+
+from utils import http_cache
+from utils.http_cache import conditional_json
+
+class TestConditionalJson:
+    """Test ETag / If-None-Match handling"""
+
+    def setup_method(self):
+        """Setup test fixtures"""
+        self.app = Flask(__name__)
+        self.calls = []
+
+    def _get(self, key, headers=None):
+        def build_body():
+            self.calls.append(key)
+            return {'key': key}
+
+        with self.app.test_request_context(headers=headers or {}):
+            return conditional_json(key, build_body)
+
+    def test_matching_etag_returns_304(self):
+        """Test a current If-None-Match skips building the body"""
+        first = self._get('product-1')
+        etag = first.headers['ETag']
+
+        second = self._get('product-1', {'If-None-Match': etag})
+
+        assert first.status_code == 200
+        assert second.status_code == 304
+        assert second.headers['ETag'] == etag
+        assert self.calls == ['product-1']
+
+    def test_changed_key_returns_full_body(self):
+        """Test a new resource version gets a new ETag and body"""
+        etag = self._get('product-1-v1').headers['ETag']
+
+        response = self._get('product-1-v2', {'If-None-Match': etag})
+
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+        assert response.get_json() == {'key': 'product-1-v2'}
+
+    def test_forked_process_gets_its_own_tag(self, monkeypatch):
+        """Test a worker forked from a preloaded master doesn't reuse the master's ETags"""
+        etag = self._get('product-1').headers['ETag']
+        monkeypatch.setattr(http_cache.os, 'getpid', lambda: -1)
+
+        response = self._get('product-1', {'If-None-Match': etag})
+
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -36,6 +36,172 @@ class TestOCRService:
         result = self.ocr_service._extract_nutrition_facts(dummy_image)
         assert isinstance(result, dict)
 
+    def test_process_food_label_bytes_invalid_image(self):
+        """Test in-memory processing rejects undecodable data"""
+        with pytest.raises(ValueError):
+            self.ocr_service.process_food_label_bytes(b'not an image')
+
+    def test_process_food_label_bytes_cached(self, monkeypatch):
+        """Test identical uploads are only processed once"""
+        import cv2
+        import numpy as np
+        _, encoded = cv2.imencode('.png', np.full((20, 20, 3), 255, dtype=np.uint8))
+        calls = []
+        monkeypatch.setattr(self.ocr_service, '_process_image',
+                            lambda image: calls.append(image) or {'raw_text': ''})
+
+        first = self.ocr_service.process_food_label_bytes(encoded.tobytes())
+        second = self.ocr_service.process_food_label_bytes(encoded.tobytes())
+
+        assert second is first
+        assert len(calls) == 1
+
+    def test_process_food_label_disk_cache(self, monkeypatch, tmp_path):
+        """Test results persisted to OCR_CACHE_DIR are reused once the worker LRU misses"""
+        import cv2
+        import numpy as np
+        from services import ocr_service
+        _, encoded = cv2.imencode('.png', np.full((20, 20, 3), 127, dtype=np.uint8))
+        monkeypatch.setattr(ocr_service, 'OCR_CACHE_DIR', str(tmp_path))
+        calls = []
+        monkeypatch.setattr(self.ocr_service, '_process_image',
+                            lambda image: calls.append(image) or {'raw_text': 'cached label'})
+
+        first = self.ocr_service.process_food_label_bytes(encoded.tobytes())
+        self.ocr_service.result_cache.clear()
+        second = self.ocr_service.process_food_label_bytes(encoded.tobytes())
+
+        assert second == first == {'raw_text': 'cached label'}
+        assert len(calls) == 1
+        assert [path.suffix for path in tmp_path.iterdir()] == ['.json']
+
+    def test_limit_size_downscales_large_images(self):
+        """Test oversized images are shrunk to the max edge"""
+        import numpy as np
+        large = np.zeros((3000, 4000, 3), dtype=np.uint8)
+        small = np.zeros((600, 800, 3), dtype=np.uint8)
+
+        assert self.ocr_service._limit_size(large, 1600).shape == (1200, 1600, 3)
+        assert self.ocr_service._limit_size(small, 1600) is small
+
+    def test_detect_nutrition_table_picks_largest_box(self):
+        """Test the largest table-shaped region wins over earlier, smaller ones"""
+        import numpy as np
+        image = np.zeros((600, 900), dtype=np.uint8)
+        image[10:160, 10:160] = 255  # small table-shaped box, found first
+        image[10:60, 300:890] = 255  # too wide
+        image[250:550, 400:700] = 255  # largest table-shaped box
+
+        assert self.ocr_service._detect_nutrition_table(image) == (400, 250, 300, 300)
+        assert self.ocr_service._detect_nutrition_table(np.zeros((50, 50), dtype=np.uint8)) is None
+
+    def test_run_ocr_passes_batches_by_config(self, monkeypatch):
+        """Test passes sharing a config run as one Tesseract call, results in pass order"""
+        import numpy as np
+        from services import ocr_service
+        calls = []
+
+        def fake_image_to_string(list_path, config=''):
+            with open(list_path) as f:
+                paths = f.read().split()
+            calls.append((config, len(paths)))
+            return ''.join(f'{Path(path).stem} text for {config}\f' for path in paths)
+
+        monkeypatch.setattr(ocr_service.pytesseract, 'image_to_string', fake_image_to_string)
+        image = np.zeros((10, 10), dtype=np.uint8)
+        texts = self.ocr_service._run_ocr_passes([
+            ('first', image, ['default', 'sparse']),
+            ('second', image, ['single_block', 'auto']),
+        ])
+
+        default = self.ocr_service.configs['default']
+        assert texts == [
+            f'0 text for {default}\f',
+            f"0 text for {self.ocr_service.configs['sparse']}\f",
+            f'1 text for {default}\f',  # single_block shares the default config
+            f"1 text for {self.ocr_service.configs['auto']}\f",
+        ]
+        assert sorted(calls) == sorted([(default, 2), (self.ocr_service.configs['sparse'], 1),
+                                        (self.ocr_service.configs['auto'], 1)])
+
+    def test_process_food_labels_shares_tesseract_calls(self, monkeypatch, tmp_path):
+        """Test a batch of labels runs one Tesseract call per config per round, not per image"""
+        import cv2
+        import numpy as np
+        from services import ocr_service
+        calls = []
+
+        def fake_image_to_string(list_path, config=''):
+            with open(list_path) as f:
+                paths = f.read().split()
+            calls.append(config)
+            return ''.join(f'label text {Path(path).stem}\f' for path in paths)
+
+        monkeypatch.setattr(ocr_service.pytesseract, 'image_to_string', fake_image_to_string)
+        monkeypatch.setattr(self.ocr_service, '_image_to_tsv', lambda image, config: '')
+        paths = []
+        for index in range(3):
+            path = tmp_path / f'label{index}.png'
+            cv2.imwrite(str(path), np.full((50, 50, 3), 255, dtype=np.uint8))
+            paths.append(str(path))
+
+        results = self.ocr_service.process_food_labels(paths)
+
+        assert len(results) == 3
+        assert all(result['raw_text'] for result in results)
+        # First round: adaptive/default for every label; then one call per distinct config
+        assert len(calls) == 1 + len(set(self.ocr_service.configs[name]
+                                         for name in ['sparse', 'default', 'auto', 'single_block']))
+
+    def test_process_image_early_exit(self, monkeypatch):
+        """Test a complete first pass skips the remaining preprocessing and passes"""
+        import numpy as np
+        complete = ('serving size: 30g protein: 20g carbohydrates: 30g total fat: 5g '
+                    'calories: 200 sugar: 3g sodium: 150mg fiber: 2g')
+        runs = []
+        monkeypatch.setattr(self.ocr_service, '_run_ocr_passes',
+                            lambda passes: runs.append(passes) or [complete] * len(passes))
+        monkeypatch.setattr(self.ocr_service, '_high_contrast_preprocessing',
+                            lambda image: pytest.fail('ran a second preprocessing method'))
+
+        result = self.ocr_service._process_image(np.full((100, 100, 3), 255, dtype=np.uint8))
+
+        assert len(runs) == 1
+        assert result['raw_text'] == complete
+        assert result['serving_size'] == '30g'
+
+    def test_unique_lines(self):
+        """Test repeated OCR pass lines are scanned once, in first-seen order"""
+        text = 'Protein: 20g\n  Fat: 5g \n\f\nProtein: 20g\nSugar: 2g\n'
+        assert self.ocr_service._unique_lines(text) == 'Protein: 20g\nFat: 5g\nSugar: 2g'
+
+    def test_contextual_ocr_single_layout_call(self, monkeypatch):
+        """Test layout regions are read from the words of one full-image OCR call"""
+        import numpy as np
+        rows = ['level\tpage_num\tblock_num\tpar_num\tline_num\tword_num\t'
+                'left\ttop\twidth\theight\tconf\ttext',
+                '4\t1\t1\t1\t1\t0\t0\t10\t200\t20\t-1\t']
+        words = [(1, 1, 'Protein:', 10, 10), (1, 1, '20g', 90, 10),
+                 (2, 1, 'Ingredients:', 10, 150), (2, 1, 'oats,', 120, 150), (2, 1, 'milk', 170, 150)]
+        for block, line, text, left, top in words:
+            rows.append(f'5\t1\t{block}\t1\t{line}\t1\t{left}\t{top}\t60\t20\t95\t{text}')
+        calls = []
+        monkeypatch.setattr(self.ocr_service, '_image_to_tsv',
+                            lambda image, config: calls.append(config) or '\n'.join(rows))
+
+        image = np.zeros((200, 300), dtype=np.uint8)
+        extracted = self.ocr_service._contextual_ocr({
+            'full_image': image,
+            'nutrition_table': image[:100],
+            'ingredient_list': image[100:],
+            'boxes': {'nutrition_table': (0, 0, 300, 100), 'ingredient_list': (0, 100, 300, 100)},
+        })
+
+        assert calls == [self.ocr_service.tesseract_config]
+        assert extracted['raw_text'] == 'Protein: 20g\nIngredients: oats, milk'
+        assert extracted['nutrition_table'] == {'protein': 20.0}
+        assert extracted['ingredient_list'] == ['oats', 'milk']
+
     def test_confidence_scoring(self):
         """Test multi-dimensional confidence scoring"""
         extracted_data = {
@@ -76,6 +242,27 @@ class TestOCRService:
         assert isinstance(clarity_score, float)
         assert 0 <= clarity_score <= 1
 
+    def test_text_clarity_of_adaptive_preprocessing(self):
+        """Test clarity and layout on the binary adaptive image (no edge overlay)"""
+        import cv2
+        import numpy as np
+        label = np.full((900, 700), 235, dtype=np.uint8)
+        cv2.rectangle(label, (60, 80), (640, 560), 30, 3)
+        for row, text in enumerate(['Nutrition Facts', 'Energy 450 kcal', 'Protein 12 g', 'Fat 18 g']):
+            cv2.putText(label, text, (80, 130 + row * 60), cv2.FONT_HERSHEY_SIMPLEX, 1.1, 30, 2)
+
+        preprocessed = self.ocr_service._adaptive_preprocessing(label)
+        overlaid = cv2.addWeighted(preprocessed, 0.8, cv2.Canny(preprocessed, 50, 150), 0.2, 0)
+
+        # A readable label saturates the clarity score either way
+        assert self.ocr_service._calculate_text_clarity(preprocessed, {}) == 1.0
+        assert self.ocr_service._calculate_text_clarity(overlaid, {}) == 1.0
+        assert (self.ocr_service._layout_analysis(preprocessed)['boxes']
+                == self.ocr_service._layout_analysis(overlaid)['boxes'])
+
+        blank = self.ocr_service._adaptive_preprocessing(np.full((200, 200), 235, dtype=np.uint8))
+        assert self.ocr_service._calculate_text_clarity(blank, {}) == 0.0
+
     def test_compliance_score_calculation(self):
         """Test compliance score calculation"""
         extracted_data = {